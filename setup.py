@@ -26,4 +26,9 @@ setup(
         'camelx',
         'pony',
     ],
+    extras_require={
+        'fast': [
+            'orjson',
+        ],
+    },
 )
@@ -53,24 +53,51 @@ In this file docstring:
 Feel free to suggest any modifications or additions to tailor this file docstring to your preferences.
 """
 import os
+import re
 import sys
 import csv
 import json
 import random
 import datetime
 import hashlib
-from time import sleep, time_ns
+from time import sleep, time_ns, perf_counter_ns
 from pprint import PrettyPrinter as pp
-from math import floor, ceil
+from math import floor
 from enum import Enum, auto
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, NamedTuple
 from pathlib import Path
 from camelx import Camel, CamelRegistry
-import shutil
+import sqlite3
+from array import array
 from abc import ABC, abstractmethod
 import pony.orm as pony
 import calendar
+import socket
+import argparse
+import tempfile
+import platform
+import subprocess
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# the number of tracked rows import_csv buffers before writing them together
+IMPORT_CSV_BATCH_SIZE = 1000
+
+# descriptions up to this length are interned, longer ones are likely free text that rarely repeats
+INTERN_MAX_LENGTH = 64
+
+# fully matches only the import_csv date formats: YYYY-MM-DD, optionally followed by
+# ' HH:MM:SS', 'THH:MM:SS' or 'THHMMSS', anything else is left to strptime
+CSV_DATE_PATTERN = re.compile(
+    r'([0-9]{4})-([0-9]{2})-([0-9]{2})'
+    r'(?: ([0-9]{2}):([0-9]{2}):([0-9]{2})|T([0-9]{2}):([0-9]{2}):([0-9]{2})|T([0-9]{2})([0-9]{2})([0-9]{2}))?'
+)
 
 
 class WeekDay(Enum):
@@ -94,12 +121,24 @@ class Vault(Enum):
     REPORT = auto()
 
 
+# JSONEncoder.default converters for the commonest exact types, found with one lookup before the isinstance checks
+JSON_DEFAULT_HANDLERS = {
+    Decimal: float,
+    datetime.datetime: datetime.datetime.isoformat,
+}
+
+
 class JSONEncoder(json.JSONEncoder):
     def default(self, obj):
+        handler = JSON_DEFAULT_HANDLERS.get(type(obj))
+        if handler is not None:
+            return handler(obj)
         if isinstance(obj, Decimal):
             return float(obj)
         elif isinstance(obj, datetime.datetime):
             return obj.isoformat()
+        elif isinstance(obj, Enum):
+            return obj.value
         elif isinstance(obj, Account):
             return obj.to_dict()
         elif obj.__class__.__name__ == "QueryResult":
@@ -109,6 +148,74 @@ class JSONEncoder(json.JSONEncoder):
             return x
         return super().default(obj)
 
+    @staticmethod
+    def dumps(obj: Any) -> str:
+        """
+        Serializes an object to a JSON string, using orjson when it is installed.
+
+        Parameters:
+        obj (Any): The object to serialize.
+
+        Returns:
+        str: The JSON string.
+        """
+        if orjson is not None:
+            return orjson.dumps(obj, default=JSONEncoder().default, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(obj, cls=JSONEncoder)
+
+    @staticmethod
+    def dump(obj: Any, path: str, depth: int = 2) -> None:
+        """
+        Serializes an object to an indented JSON file, using orjson when it is installed.
+
+        The outer `depth` levels of dictionaries are written entry by entry, so only one
+        entry at that level (e.g. a single account of the vault) is encoded in memory at a time.
+        The file content is the same as encoding the whole object at once.
+
+        Parameters:
+        obj (Any): The object to serialize.
+        path (str): The path of the JSON file.
+        depth (int, Optional): The number of dictionary levels to stream. Defaults to 2.
+
+        Returns:
+        None
+        """
+        if orjson is not None:
+            default = JSONEncoder().default
+            indent = 2
+
+            def encode(value: Any, option: int = orjson.OPT_INDENT_2) -> str:
+                return orjson.dumps(value, default=default, option=option | orjson.OPT_NON_STR_KEYS).decode()
+
+            def encode_key(key: Any) -> str:
+                pair = encode({key: None}, 0)
+                return pair[1:pair.rindex(':')]
+        else:
+            indent = 4
+
+            def encode(value: Any) -> str:
+                return json.dumps(value, indent=indent, cls=JSONEncoder)
+
+            def encode_key(key: Any) -> str:
+                pair = json.dumps({key: None}, cls=JSONEncoder)
+                return pair[1:pair.rindex(':')]
+
+        with open(path, 'w', encoding='utf-8') as file:
+            def write(value: Any, level: int, depth: int) -> None:
+                if depth <= 0 or not isinstance(value, dict) or not value:
+                    file.write(encode(value).replace('\n', '\n' + ' ' * (indent * level)))
+                    return
+                padding = ' ' * (indent * (level + 1))
+                file.write('{')
+                for i, (k, v) in enumerate(value.items()):
+                    file.write(',\n' if i else '\n')
+                    file.write(padding)
+                    file.write(encode_key(k))
+                    file.write(': ')
+                    write(v, level + 1, depth - 1)
+                file.write('\n' + ' ' * (indent * level) + '}')
+
+            write(obj, 0, depth)
 
 camel_registry = CamelRegistry()
 
@@ -203,6 +310,28 @@ class Model(ABC):
         ValueError: The created must be a str, <class 'xxx'> was provided.
         """
 
+    @abstractmethod
+    def track_many(self, account: int, rows: list[tuple[float | int | Decimal, str, str | None]],
+                   debug: bool = False) -> list[str | None]:
+        """
+        Tracks many logged transactions into one account at once, each like `track` does for one,
+        so that backends can write them together.
+
+        Parameters:
+        account (int): The account for which the transactions are being tracked.
+        rows (list[tuple[float | int | Decimal, str, str | None]]): The unscaled value, description and datetime in iso8601
+            of every transaction, a None datetime is generated like `track` does.
+        debug (bool, Optional): Whether to print debug information. Default is False.
+
+        Returns:
+        list[str | None]: The datetime of every transaction in iso8601, or None for the zero values.
+
+        Raises:
+        ValueError: The log transaction('xxx') happened again in the same time.
+        ValueError: The box transaction happened again in the same time.
+        ValueError: The created must be a str, <class 'xxx'> was provided.
+        """
+
     @abstractmethod
     def add_file(self, account: int, ref: str, path: str) -> str | None:
         """
@@ -311,6 +440,21 @@ class Model(ABC):
         dict: A dictionary where keys are account numbers and values are their respective balances.
         """
 
+    @abstractmethod
+    def accounts_with_rates(self, positive_only: bool = False, created: str = None) \
+            -> tuple[list[int], list[int], list[float]]:
+        """
+        Returns the accounts with their balances and latest exchange rates at once, as parallel lists.
+
+        Parameters:
+        positive_only (bool, Optional): If True, only accounts with a positive balance are returned. Default is False.
+        created (str, Optional): The datetime in iso8601 of the exchange rates. Defaults to the current datetime.
+
+        Returns:
+        tuple[list[int], list[int], list[float]]: The account numbers, their balances, and their exchange rates,
+            where the rate is 1 for accounts without any exchange rate.
+        """
+
     @abstractmethod
     def set_exchange(self, account: int, created: str = None, rate: float = None, description: str = None,
                      debug: bool = False) -> bool:
@@ -328,6 +472,22 @@ class Model(ABC):
         bool: True if exchange is created, False otherwise.
         """
 
+    @abstractmethod
+    def set_exchanges(self, account: int, rows: list[tuple[str | None, float, str | None]], debug: bool = False) -> list[bool]:
+        """
+        Records many exchange rates of one account at once, each like `set_exchange` does for one,
+        so that backends can write them together.
+
+        Parameters:
+        - account (int): The account number for which the exchange rates are being recorded.
+        - rows (list[tuple[str | None, float, str | None]]): The datetime in iso8601, rate and description of every exchange.
+            A datetime of None means the current datetime, as in `set_exchange`.
+        - debug (bool, Optional): Whether to print debug information. Default is False.
+
+        Returns:
+        list[bool]: For every row, True if its exchange is created, False otherwise (not positive rate).
+        """
+
     @abstractmethod
     def exchange(self, account: int, created: str = None, debug: bool = False) -> dict:
         """
@@ -557,6 +717,18 @@ class Model(ABC):
         int: The size of the log for the given account. If the account does not exist, -1 is returned.
         """
 
+    @abstractmethod
+    def log_total(self, account_id: int) -> int:
+        """
+        Get the sum of the log values of a specific account.
+
+        Parameters:
+        account_id (int): The account number for which the log values are summed.
+
+        Returns:
+        int: The sum of the log values of the given account, 0 if the account does not exist.
+        """
+
     @abstractmethod
     def save(self, path: str = None) -> bool:
         """
@@ -657,8 +829,8 @@ class Model(ABC):
         Generates the cache file path for imported CSV data.
 
         This function constructs the file path where cached data from CSV imports
-        will be stored. The cache file is a camel file (.camel extension) appended
-        to the base path of the object.
+        will be stored. The cache file is an append-only binary file (.hashes extension)
+        of 8-byte little-endian row hashes, appended to the base path of the object.
 
         Returns:
         str: The full path to the import CSV cache file.
@@ -666,7 +838,7 @@ class Model(ABC):
         Example:
             >>> obj = ZakatTracker(model=DictModel('/data/reports'))
             >>> obj.db.import_csv_cache_path()
-            '/data/reports.import_csv.camel'
+            '/data/reports.import_csv.hashes'
         """
 
     @abstractmethod
@@ -849,6 +1021,21 @@ class Model(ABC):
         bool: True if the reference exists for the given account and reference type, False otherwise.
         """
 
+    @abstractmethod
+    def refs_exist(self, account_id: int, ref_type: str, refs: list[str]) -> set[str]:
+        """
+        Check which of many references (transactions) exist in the vault for a given account and reference type,
+        resolving all of them at once instead of calling `ref_exists` per reference.
+
+        Parameters:
+        account_id (int): The account number for which to check the existence of the references.
+        ref_type (str): The type of reference (e.g., 'box', 'log', etc.).
+        refs (list[str]): The references (transactions) datetime in iso8601 to check for existence.
+
+        Returns:
+        set[str]: The subset of `refs` that exist for the given account and reference type.
+        """
+
     @abstractmethod
     def box_exists(self, account_id: int, ref: str) -> bool:
         """
@@ -919,6 +1106,7 @@ class Helper:
     - Numeric scaling and unscaling
     - Date/time conversions
     - Human-readable size formatting
+    - String interning
     - File hashing
     - Time duration formatting
     - Checks if the operating system is Windows
@@ -927,7 +1115,7 @@ class Helper:
     """
 
     last_time = None
-    time_diff_ms = None
+    last_clock_time = None
 
     @staticmethod
     def minimum_time_diff_ms() -> tuple[float, int]:
@@ -973,18 +1161,37 @@ class Helper:
     @staticmethod
     def time(now: datetime = None) -> str:
         new_time = Helper._time(now)
-        if Helper.last_time is None:
-            Helper.last_time = new_time
-            return new_time
-        while new_time == Helper.last_time:
-            if Helper.time_diff_ms is None:
-                diff, _ = Helper.minimum_time_diff_ms()
-                Helper.time_diff_ms = ceil(diff)
-            sleep(Helper.time_diff_ms / 1_000)
-            new_time = Helper._time()
+        if now is None or new_time == Helper.last_time:
+            if now is not None:
+                new_time = Helper._time()
+            # a coarse clock may repeat itself, so step one microsecond past the last clock time instead of waiting
+            if Helper.last_clock_time is not None and new_time <= Helper.last_clock_time:
+                new_time = (Helper.time_to_datetime(Helper.last_clock_time) + datetime.timedelta(microseconds=1)).isoformat()
+            Helper.last_clock_time = new_time
         Helper.last_time = new_time
         return new_time
 
+    @staticmethod
+    def times(count: int) -> list[str]:
+        """
+        Generates many unique and increasing times at once, for batch inserts.
+
+        Only the first time is read from the clock, the others follow it one microsecond apart,
+        and `Helper.time` continues after the last of them, so it never returns any of them later.
+
+        Parameters:
+        count (int): The number of times to generate.
+
+        Returns:
+        list[str]: The generated times in ISO 8601 format.
+        """
+        if count <= 0:
+            return []
+        first = Helper.time_to_datetime(Helper.time())
+        result = [(first + datetime.timedelta(microseconds=i)).isoformat() for i in range(count)]
+        Helper.last_time = Helper.last_clock_time = result[-1]
+        return result
+
     @staticmethod
     def _time(now: datetime = None) -> str:
         if now is None:
@@ -1190,6 +1397,26 @@ class Helper:
         """
         return 0.025 * x  # Zakat Cut in one Lunar Year
 
+    @staticmethod
+    def ZakatCutCycles(x: float, cycles: int) -> float:
+        """
+        Calculates the accumulated Zakat amount due on an asset over many lunar years.
+
+        Every lunar year takes its Zakat Cut from what the previous years left behind. The years are
+        summed one by one, as the closed form rounds differently and would change the stored amounts.
+
+        Parameters:
+        x: The total value of the asset on which Zakat is to be calculated.
+        cycles: The number of lunar years the asset was held.
+
+        Returns:
+        The accumulated amount of Zakat due on the asset over all the cycles.
+        """
+        total = 0
+        for _ in range(cycles):
+            total += Helper.ZakatCut(float(x) - float(total))
+        return total
+
     @staticmethod
     def exchange_calc(x: float, x_rate: float, y_rate: float) -> float:
         """
@@ -1270,17 +1497,17 @@ class Helper:
             if i not in parts:
                 return 1
         exceed = parts['exceed']
-        for x in parts['account']:
-            for j in ['balance', 'rate', 'part']:
-                if j not in parts['account'][x]:
-                    return 2
-                if parts['account'][x]['part'] < 0:
-                    return 3
-                if not exceed and parts['account'][x]['balance'] <= 0:
-                    return 4
+        accounts = parts['account'].values()
+        for y in accounts:
+            if 'balance' not in y or 'rate' not in y or 'part' not in y:
+                return 2
+            if y['part'] < 0:
+                return 3
+            if not exceed and y['balance'] <= 0:
+                return 4
         demand = parts['demand']
         z = 0
-        for _, y in parts['account'].items():
+        for y in accounts:
             if not exceed and y['part'] > y['balance']:
                 return 5
             z += Helper.exchange_calc(y['part'], y['rate'], 1)
@@ -1375,6 +1602,8 @@ class Helper:
         """
         if not isinstance(x, (float, int, Decimal)):
             raise TypeError("Input 'x' must be a float, int, or Decimal.")
+        if isinstance(x, int) and decimal_places >= 0:
+            return int(x) * 10 ** decimal_places  # exact already, no need to round-trip through Decimal
         return int(Decimal(f"{x:.{decimal_places}f}") * (10 ** decimal_places))
 
     @staticmethod
@@ -1397,6 +1626,21 @@ class Helper:
             raise TypeError(f'Invalid return_type({return_type}). Supported types are float, int, and Decimal.')
         return round(return_type(x / (10 ** decimal_places)), decimal_places)
 
+    @staticmethod
+    def intern(text: str | None) -> str | None:
+        """
+        Interns a short string, so the repeated descriptions and names of a vault share one object.
+
+        Parameters:
+        text (str | None): The string to intern.
+
+        Returns:
+        str | None: The interned string, or the input as is when it is not a str or longer than INTERN_MAX_LENGTH.
+        """
+        if type(text) is str and len(text) <= INTERN_MAX_LENGTH:
+            return sys.intern(text)
+        return text
+
     @staticmethod
     def human_readable_size(size: float, decimal_places: int = 2) -> str:
         """
@@ -1440,12 +1684,30 @@ class Helper:
         Returns:
         str: The hexadecimal representation of the file's hash.
         """
-        hash_obj = hashlib.new(algorithm)  # Create the hash object
         with open(file_path, "rb") as f:  # Open file in binary mode for reading
-            for chunk in iter(lambda: f.read(4096), b""):  # Read file in chunks
-                hash_obj.update(chunk)
+            if hasattr(hashlib, 'file_digest'):  # Python 3.11+, reads into one reused buffer
+                return hashlib.file_digest(f, algorithm).hexdigest()
+            hash_obj = hashlib.new(algorithm)  # Create the hash object
+            buffer = bytearray(1 << 20)  # Read file in 1 MiB chunks into the same buffer
+            view = memoryview(buffer)
+            while size := f.readinto(buffer):
+                hash_obj.update(view[:size])
         return hash_obj.hexdigest()  # Return the hash as a hexadecimal string
 
+    @staticmethod
+    def stable_hash(data: bytes) -> int:
+        """
+        Calculates a 64-bit hash of the given bytes that, unlike the built-in `hash`,
+        stays the same across interpreter runs regardless of `PYTHONHASHSEED`.
+
+        Parameters:
+        data (bytes): The bytes to hash.
+
+        Returns:
+        int: The signed 64-bit hash of the data.
+        """
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little', signed=True)
+
     @staticmethod
     def duration_from_nanoseconds(ns: int,
                                   show_zeros_in_spoken_time: bool = False,
@@ -1562,6 +1824,18 @@ class Helper:
         if debug:
             print('count', xx, ' - unique: ', (xx / limit) * 100, '%')
         assert limit == xx
+        assert xlist == sorted(xlist)
+        past = datetime.datetime(2000, 1, 1)
+        assert Helper.time(past) == past.isoformat()
+        assert Helper.time(past) > xlist[-1]  # a repeated time is replaced by the clock
+
+        # sanity check - batch of forward times
+
+        xlist = Helper.times(limit)
+        assert len(set(xlist)) == limit
+        assert xlist == sorted(xlist)
+        assert Helper.time() > xlist[-1]
+        assert Helper.times(0) == []
 
         # sanity check - convert date since 1AD to 9999AD
 
@@ -1671,6 +1945,14 @@ class Helper:
             assert result.second == expected.second
             assert result.microsecond == expected.microsecond
 
+        # intern
+
+        short = ''.join(['zakat', '-desc'])
+        assert Helper.intern(short) is Helper.intern('zakat-desc')
+        long = 'x' * (INTERN_MAX_LENGTH + 1)
+        assert Helper.intern(long) is long
+        assert Helper.intern(None) is None
+
         # human_readable_size
 
         assert Helper.human_readable_size(0) == "0.00 B"
@@ -1740,6 +2022,65 @@ class Helper:
         if debug:
             print(f'total: {total}, error({error}): {100 * error / total}%')
         assert error == 0
+        for i in (0, 1, -1, 1234, -1234, 10 ** 20):
+            for decimal_places in (0, 2, 8, 18):
+                assert Helper.scale(i, decimal_places=decimal_places) == int(Decimal(f"{i:.{decimal_places}f}") * (10 ** decimal_places))
+        assert Helper.scale(True) == 100
+
+        # zakat cut over many cycles
+
+        for x in [0, 1, 200_000, 1_875_000, 10_000_000, 123_456_789]:
+            for cycles in range(0, 50):
+                total = 0
+                for _ in range(cycles):
+                    total += Helper.ZakatCut(float(x) - float(total))
+                if debug:
+                    print(f'x: {x}, cycles: {cycles}, loop: {total}, cycles: {Helper.ZakatCutCycles(x, cycles)}')
+                assert Helper.ZakatCutCycles(x, cycles) == total
+        assert Helper.ZakatCutCycles(10_000_000, 2) == 493750.0
+
+        # stable hash
+
+        assert Helper.stable_hash(b'') == Helper.stable_hash(b'')
+        assert Helper.stable_hash(b'a\x1fb') != Helper.stable_hash(b'a\x1fc')
+        assert Helper.stable_hash(b'zakat') == -4255789810251729330
+        for x in [b'', b'0', b'zakat', bytes(range(256))]:
+            assert -2 ** 63 <= Helper.stable_hash(x) < 2 ** 63
+
+        # json encoding, the same with or without orjson
+
+        assert json.loads(JSONEncoder.dumps({1: Vault.ACCOUNT, 'x': Decimal('1.5')})) == {'1': Vault.ACCOUNT.value, 'x': 1.5}
+        moment = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        for handled, expected in ((Decimal('2.5'), 2.5), (moment, moment.isoformat())):
+            assert type(handled) in JSON_DEFAULT_HANDLERS
+            assert JSONEncoder().default(handled) == expected
+        obj = {'account': {1: {'box': {'2024-01-01T00:00:00': {'rest': 5}}, 'log': {}}, 2: []}, 'name': {}, 'x': Decimal('1.5')}
+        with tempfile.TemporaryDirectory() as folder:
+            for depth in range(4):
+                path = os.path.join(folder, f'{depth}.json')
+                JSONEncoder.dump(obj, path, depth=depth)
+                with open(path, encoding='utf-8') as file:
+                    content = file.read()
+                if orjson is not None:
+                    expected = orjson.dumps(
+                        obj,
+                        default=JSONEncoder().default,
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+                    ).decode()
+                else:
+                    expected = json.dumps(obj, indent=4, cls=JSONEncoder)
+                assert content == expected
+
+        # file hash
+
+        data = b'zakat' * 100_000
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(data)
+        try:
+            assert Helper.file_hash(file.name) == hashlib.blake2b(data).hexdigest()
+            assert Helper.file_hash(file.name, 'sha256') == hashlib.sha256(data).hexdigest()
+        finally:
+            os.remove(file.name)
 
 
 class DictModel(Model):
@@ -1763,6 +2104,9 @@ class DictModel(Model):
         self._base_path = None
         self._vault_path = None
         self._vault = None
+        self._exchange_index: dict[int, tuple[list[int], list[str]]] = {}  # account: (sorted times, their refs)
+        self._log_totals: dict[int, int] = {}  # account: sum of its log values, kept up to date once computed
+        self._fresh_balances: dict[int, int] = {}  # account: sum of its box rests, dropped whenever a box changes
         self.reset()
         self.path(db_path)
         self.provider = 'dict'
@@ -1787,6 +2131,9 @@ class DictModel(Model):
             'exchange': {},
             'report': {},
         }
+        self._exchange_index.clear()
+        self._log_totals.clear()
+        self._fresh_balances.clear()
 
     def ext(self) -> str | None:
         return 'camel'
@@ -1886,6 +2233,13 @@ class DictModel(Model):
             return len(self._vault['account'][account_id]['log'])
         return -1
 
+    def log_total(self, account_id: int) -> int:
+        if not self.account_exists(account_id):
+            return 0
+        if account_id not in self._log_totals:
+            self._log_totals[account_id] = sum(x['value'] for x in self._vault['account'][account_id]['log'].values())
+        return self._log_totals[account_id]
+
     def snapshot_cache_path(self):
         """
         Generate the path for the cache file used to store snapshots.
@@ -1930,6 +2284,13 @@ class DictModel(Model):
             return ref in self._vault['account'][account_id][ref_type]
         return False
 
+    def refs_exist(self, account_id: int, ref_type: str, refs: list[str]) -> set[str]:
+        if not isinstance(account_id, int):
+            raise ValueError(f'The account_id must be an integer, {type(account_id)} was provided.')
+        if account_id in self._vault['account']:
+            return set(refs).intersection(self._vault['account'][account_id][ref_type])
+        return set()
+
     def box_exists(self, account_id: int, ref: str) -> bool:
         return self.ref_exists(account_id, 'box', ref)
 
@@ -1978,10 +2339,12 @@ class DictModel(Model):
             print('created-log', created)
         self._vault['account'][account_id]['log'][created] = {
             'value': value,
-            'desc': desc,
+            'desc': Helper.intern(desc),
             'ref': ref,
             'file': {},
         }
+        if account_id in self._log_totals:
+            self._log_totals[account_id] += value
         return created
 
     def exchanges(self, account: int) -> dict | None:
@@ -1995,6 +2358,19 @@ class DictModel(Model):
             result[i] = self._vault['account'][i]['balance']
         return result
 
+    def accounts_with_rates(self, positive_only: bool = False, created: str = None) \
+            -> tuple[list[int], list[int], list[float]]:
+        if created is None:
+            created = Helper.time()
+        ids, balances, rates = [], [], []
+        for account, balance in self.accounts().items():
+            if positive_only and balance <= 0:
+                continue
+            ids.append(account)
+            balances.append(balance)
+            rates.append(self.exchange(account, created=created)['rate'])
+        return ids, balances, rates
+
     def boxes(self, account_id: int) -> dict:
         if self.account_exists(account_id):
             return self._vault['account'][account_id]['box']
@@ -2050,54 +2426,29 @@ class DictModel(Model):
             transfer = len(logs[i]) > 1
             if debug:
                 print('logs[i]', logs[i])
+            # the logs of the same time are summed once, then added to each of their periods
+            positive = negative = total = 0
             for z in logs[i]:
                 if debug:
                     print('z', z)
-                # daily
                 value = z['value']
                 if value > 0:
-                    y['daily'][daily]['positive'] += value
+                    positive += value
                 else:
-                    y['daily'][daily]['negative'] += -value
-                y['daily'][daily]['total'] += value
+                    negative += -value
+                total += value
                 z['transfer'] = transfer
                 y['daily'][daily]['rows'].append(z)
-                # weekly
-                if weekly not in y['weekly']:
-                    y['weekly'][weekly] = {
-                        'positive': 0,
-                        'negative': 0,
-                        'total': 0,
-                    }
-                if value > 0:
-                    y['weekly'][weekly]['positive'] += value
-                else:
-                    y['weekly'][weekly]['negative'] += -value
-                y['weekly'][weekly]['total'] += value
-                # monthly
-                if monthly not in y['monthly']:
-                    y['monthly'][monthly] = {
-                        'positive': 0,
-                        'negative': 0,
-                        'total': 0,
-                    }
-                if value > 0:
-                    y['monthly'][monthly]['positive'] += value
-                else:
-                    y['monthly'][monthly]['negative'] += -value
-                y['monthly'][monthly]['total'] += value
-                # yearly
-                if yearly not in y['yearly']:
-                    y['yearly'][yearly] = {
+            for period, key in (('daily', daily), ('weekly', weekly), ('monthly', monthly), ('yearly', yearly)):
+                if key not in y[period]:
+                    y[period][key] = {
                         'positive': 0,
                         'negative': 0,
                         'total': 0,
                     }
-                if value > 0:
-                    y['yearly'][yearly]['positive'] += value
-                else:
-                    y['yearly'][yearly]['negative'] += -value
-                y['yearly'][yearly]['total'] += value
+                y[period][key]['positive'] += positive
+                y[period][key]['negative'] += negative
+                y[period][key]['total'] += total
         if debug:
             print('y', y)
         return y
@@ -2139,10 +2490,18 @@ class DictModel(Model):
             'rest': value,
             'total': 0,
         }
+        self._fresh_balances.pop(account, None)
         if debug:
             print('created-box', created)
         return created
 
+    def track_many(self, account: int, rows: list[tuple[float | int | Decimal, str, str | None]],
+                   debug: bool = False) -> list[str | None]:
+        return [
+            self.track(unscaled_value=value, desc=desc, account=account, logging=True, created=created, debug=debug)
+            for value, desc, created in rows
+        ]
+
     def set_exchange(self, account: int, created: str = None, rate: float = None, description: str = None,
                      debug: bool = False) -> bool:
         if debug:
@@ -2156,25 +2515,44 @@ class DictModel(Model):
         if not self.account_exists(account):
             self.track(account=account, debug=debug)
         self._vault['account'][account]['exchange'][created] = {"rate": rate, "description": description}
+        self._exchange_index.pop(account, None)
         if debug:
             print("exchange-created-1",
                   f'account: {account}, created: {created}, rate:{rate}, description:{description}')
         return True
 
+    def set_exchanges(self, account: int, rows: list[tuple[str | None, float, str | None]], debug: bool = False) -> list[bool]:
+        if debug:
+            print('set_exchanges', f'rows={rows}')
+        if not isinstance(account, int):
+            raise ValueError(f'The account must be an integer, {type(account)} was provided.')
+        rows = [(Helper.time() if created is None else created, rate, description) for created, rate, description in rows]
+        result = [rate > 0 for _, rate, _ in rows]
+        if any(result):
+            if not self.account_exists(account):
+                self.track(account=account, debug=debug)
+            self._vault['account'][account]['exchange'].update({
+                created: {"rate": rate, "description": description}
+                for created, rate, description in rows
+                if rate > 0
+            })
+            self._exchange_index.pop(account, None)
+        return result
+
     def exchange(self, account: int, created: str = None, debug: bool = False) -> dict:
         if not isinstance(account, int):
             raise ValueError(f'The account must be an integer, {type(account)} was provided.')
         if created is None:
             created = Helper.time()
         if self.account_exists(account):
-            valid_rates = [
-                (ts, r)
-                for ts, r in self._vault['account'][account]['exchange'].items()
-                if Helper.iso8601_to_int(ts, strict=False, debug=debug) <=
-                   Helper.iso8601_to_int(created, strict=False, debug=debug)
-            ]
-            if valid_rates:
-                latest_rate = max(valid_rates, key=lambda x: x[0])
+            exchanges = self._vault['account'][account]['exchange']
+            if account not in self._exchange_index:
+                index = sorted((Helper.iso8601_to_int(ts, strict=False, debug=debug), ts) for ts in exchanges)
+                self._exchange_index[account] = ([x for x, _ in index], [ts for _, ts in index])
+            times, refs = self._exchange_index[account]
+            i = bisect_right(times, Helper.iso8601_to_int(created, strict=False, debug=debug)) - 1
+            if i >= 0:
+                latest_rate = (refs[i], exchanges[refs[i]])
                 if debug:
                     print("exchange-read-1", f'account={account}, created={created}, latest_rate={latest_rate}')
                 result = latest_rate[1]
@@ -2205,8 +2583,9 @@ class DictModel(Model):
             raise ValueError(f'The account must be an integer, {type(account_id)} was provided.')
         if cached:
             return self._vault['account'][account_id]['balance']
-        x = 0
-        return [x := x + y['rest'] for y in self._vault['account'][account_id]['box'].values()][-1]
+        if account_id not in self._fresh_balances:
+            self._fresh_balances[account_id] = sum(y['rest'] for y in self._vault['account'][account_id]['box'].values())
+        return self._fresh_balances[account_id]
 
     def hide(self, account_id: int, status: bool = None) -> bool:
         if self.account_exists(account_id):
@@ -2242,6 +2621,7 @@ class DictModel(Model):
         def set_name(_account: int, _name: str):
             if not self.account_exists(_account):
                 self.track(account=_account)
+            _name = Helper.intern(_name)
             self._vault['account'][_account]['name'] = _name
             self._vault['name']['account'][_name] = _account
             self._vault['name']['account'][_account] = _name
@@ -2308,6 +2688,7 @@ class DictModel(Model):
             if debug:
                 print('i', i, 'j', j)
             rest = self._vault['account'][account]['box'][j]['rest']
+            self._fresh_balances.pop(account, None)
             if rest >= target:
                 self._vault['account'][account]['box'][j]['rest'] -= target
                 ages.append((j, target))
@@ -2370,6 +2751,7 @@ class DictModel(Model):
                 if rest + target_amount > capital:
                     self._vault['account'][to_account]['box'][age]['capital'] += target_amount
                 self._vault['account'][to_account]['box'][age]['rest'] += target_amount
+                self._fresh_balances.pop(to_account, None)
                 y = self.log(value=target_amount, desc=f'TRANSFER {from_account} -> {to_account}',
                              account_id=to_account,
                              created=None, ref=None, debug=debug)
@@ -2420,21 +2802,24 @@ class DictModel(Model):
             _box = self._vault['account'][x]['box']
             _log = self._vault['account'][x]['log']
             limit = len(_box) + 1
-            ids = sorted(self._vault['account'][x]['box'].keys())
+            ids = sorted(_box)
+            exchange = None  # the current exchange of the account, read once for all of its boxes
             for i in range(-1, -limit, -1):
                 j = ids[i]
-                rest = float(_box[j]['rest'])
+                box = _box[j]
+                rest = float(box['rest'])
                 if rest <= 0:
                     continue
-                exchange = self.exchange(x, debug=debug)
+                if exchange is None:
+                    exchange = self.exchange(x, debug=debug)
                 rest = Helper.exchange_calc(rest, float(exchange['rate']), 1)
                 brief[0] += rest
                 index = limit + i - 1
                 jj = j if type(j) is int else Helper.time_to_milliseconds(j)
                 epoch = (now_ms - jj) / cycle
                 if debug:
-                    print(f"Epoch: {epoch}", _box[j])
-                last = _box[j]['last'] if type(_box[j]['last']) is int else Helper.time_to_milliseconds(_box[j]['last'])
+                    print(f"Epoch: {epoch}", box)
+                last = box['last'] if type(box['last']) is int else Helper.time_to_milliseconds(box['last'])
                 if last > 0:
                     epoch = (now_ms - last) / cycle
                 if debug:
@@ -2448,9 +2833,7 @@ class DictModel(Model):
                     print("Epoch - PASSED")
                 brief[1] += rest
                 if rest >= nisab:
-                    total = 0
-                    for _ in range(epoch):
-                        total += Helper.ZakatCut(float(rest) - float(total))
+                    total = Helper.ZakatCutCycles(float(rest), epoch)
                     if total > 0:
                         if x not in plan:
                             plan[x] = {}
@@ -2460,11 +2843,11 @@ class DictModel(Model):
                             'total': total,
                             'count': epoch,
                             'box_time': j,
-                            'box_capital': _box[j]['capital'],
-                            'box_rest': _box[j]['rest'],
-                            'box_last': _box[j]['last'],
-                            'box_total': _box[j]['total'],
-                            'box_count': _box[j]['count'],
+                            'box_capital': box['capital'],
+                            'box_rest': box['rest'],
+                            'box_last': box['last'],
+                            'box_total': box['total'],
+                            'box_count': box['count'],
                             'box_log': _log[j]['desc'],
                             'exchange_rate': exchange['rate'],
                             'exchange_time': exchange['time'],
@@ -2484,11 +2867,11 @@ class DictModel(Model):
                             'total': chunk,
                             'count': epoch,
                             'box_time': j,
-                            'box_capital': _box[j]['capital'],
-                            'box_rest': _box[j]['rest'],
-                            'box_last': _box[j]['last'],
-                            'box_total': _box[j]['total'],
-                            'box_count': _box[j]['count'],
+                            'box_capital': box['capital'],
+                            'box_rest': box['rest'],
+                            'box_last': box['last'],
+                            'box_total': box['total'],
+                            'box_count': box['count'],
                             'box_log': _log[j]['desc'],
                             'exchange_rate': exchange['rate'],
                             'exchange_time': exchange['time'],
@@ -2542,6 +2925,7 @@ class DictModel(Model):
                         self._vault['account'][x]['box'][j]['rest'] -= amount
                     except TypeError:
                         self._vault['account'][x]['box'][j]['rest'] -= Decimal(amount)
+                    self._fresh_balances.pop(x, None)
                     self.log(-float(amount), desc='zakat-زكاة', account_id=x, created=None, ref=j, debug=debug)
         if parts_exist:
             for account, part in parts['account'].items():
@@ -2560,19 +2944,18 @@ class DictModel(Model):
         return True
 
     def export_json(self, path: str = "data.json") -> bool:
-        with open(path, "w") as file:
-            json.dump(self._vault, file, indent=4, cls=JSONEncoder)
-            return True
+        JSONEncoder.dump(self._vault, path)
+        return True
 
     def save(self, path: str = None) -> bool:
         if path is None:
             path = self.path()
+        # first save in tmp file
         with open(f'{path}.tmp', 'w') as stream:
-            # first save in tmp file
             stream.write(camel.dump(self._vault))
-            # then move tmp file to original location
-            shutil.move(f'{path}.tmp', path)
-            return True
+        # then, once it is complete and closed, atomically replace the original with it
+        os.replace(f'{path}.tmp', path)
+        return True
 
     def load(self, path: str = None) -> bool:
         if path is None:
@@ -2580,6 +2963,12 @@ class DictModel(Model):
         if os.path.exists(path):
             with open(path, 'r') as stream:
                 self._vault = camel.load(stream.read())
+                for account in self._vault['account'].values():
+                    for log in account['log'].values():
+                        log['desc'] = Helper.intern(log['desc'])
+                self._exchange_index.clear()
+                self._log_totals.clear()
+                self._fresh_balances.clear()
                 return True
         return False
 
@@ -2589,7 +2978,7 @@ class DictModel(Model):
         ext_len = len(ext)
         if path.endswith(f'.{ext}'):
             path = path[:-ext_len - 1]
-        _, filename = os.path.split(path + f'.import_csv.{ext}')
+        _, filename = os.path.split(path + '.import_csv.hashes')
         return self.base_path(filename)
 
     @staticmethod
@@ -2676,6 +3065,7 @@ class Exchange(db.Entity):
     else:
     	desc = pony.Optional(str, 255)
     created_at = pony.Required(datetime.datetime, default=lambda: datetime.datetime.now())
+    pony.composite_index(account, record_date)
 
 
 class Report(db.Entity):
@@ -2686,6 +3076,49 @@ class Report(db.Entity):
     created_at = pony.Required(datetime.datetime, default=lambda: datetime.datetime.now())
 
 
+@db.on_connect(provider='sqlite')
+def sqlite_pragmas(database, connection):
+    """
+    Tunes every new SQLite connection for the write-heavy workload of the tracker.
+
+    The WAL journal with NORMAL synchronous mode syncs once per checkpoint instead of once per commit,
+    and lets readers run while a zakat is being written, the rest keeps temporary tables, the page cache
+    and reads in memory.
+    """
+    cursor = connection.cursor()
+    cursor.execute('PRAGMA journal_mode = WAL;')
+    cursor.execute('PRAGMA synchronous = NORMAL;')
+    cursor.execute('PRAGMA temp_store = MEMORY;')
+    cursor.execute('PRAGMA cache_size = -65536;')
+    cursor.execute('PRAGMA mmap_size = 268435456;')
+
+
+# the tables emptied by a reset, each one before the tables it references,
+# sqlite_sequence is cleared after them, so the ids of a reset SQLite model restart from 1
+RESET_TABLES = ('file', 'log', 'box', 'exchange', 'report', 'account')
+
+# SQLite caps the number of bound parameters per statement, so bulk lookups are split in chunks below it
+REFS_EXIST_CHUNK_SIZE = 900
+
+# the existence check and entity of every reference type, the sql kept constant so its prepared statement is reused
+REF_TABLES: dict[str, tuple[str, type]] = {
+    'box': ('''
+        SELECT  1
+        FROM    box
+        WHERE   account_id = $account_id    AND
+                record_date = $ref
+        LIMIT   1;
+    ''', Box),
+    'log': ('''
+        SELECT  1
+        FROM    log
+        WHERE   account_id = $account_id    AND
+                record_date = $ref
+        LIMIT   1;
+    ''', Log),
+}
+
+
 class SQLModel(Model):
     """
     A model that maps to a SQLite database tables.
@@ -2721,6 +3154,8 @@ class SQLModel(Model):
         self.debug = False
         self._file_exists = False
         self.raw_sql = True
+        # (ref_type, account_id, ref) known to be missing by refs_exist, dropped whenever such a ref is written
+        self._missing_refs: set[tuple[str, int, str]] = set()
         self.provider = str.lower(db_params['provider'])
 
         if self.provider == 'sqlite' and 'filename' in db_params:
@@ -2752,6 +3187,55 @@ class SQLModel(Model):
     def file_exists(self) -> bool:
         return self._file_exists
 
+    @pony.db_session
+    def warmup(self) -> None:
+        """
+        Opens the database connection of the current thread ahead of the first real query.
+
+        Pony connects lazily, so without it the first query also pays for the connect, the authentication
+        and the connection tuning, pony then keeps the connection open for the next sessions of the thread.
+
+        Returns:
+        None
+        """
+        self._exec('SELECT 1;')
+
+    @staticmethod
+    def _exec(sql: str, params: dict = None):
+        """
+        Executes a raw SQL statement, binding its `$name` placeholders from `params`.
+
+        The SQL text stays constant between calls, so Pony reuses the adapted statement
+        from its cache and the driver reuses the prepared statement on the connection
+        instead of parsing a freshly formatted query every time.
+
+        Parameters:
+        sql (str): The SQL statement with `$name` placeholders.
+        params (dict, optional): The values to bind to the placeholders. Default is None.
+
+        Returns:
+        The database cursor of the executed statement.
+        """
+        return db.execute(sql, {}, params if params else {})
+
+    @staticmethod
+    def _exec_many(sql: str, rows: list[dict]) -> None:
+        """
+        Executes a raw SQL statement once for every row of parameters.
+
+        Every row goes through `_exec`, so Pony flushes pending ORM changes and tracks the modification
+        as usual, while the constant SQL text keeps the adapted and prepared statement reused between rows.
+
+        Parameters:
+        sql (str): The SQL statement with `$name` placeholders.
+        rows (list[dict]): The values to bind to the placeholders, one dict per execution.
+
+        Returns:
+        None
+        """
+        for row in rows:
+            SQLModel._exec(sql, row)
+
     @pony.db_session
     def sub(self, unscaled_value: float | int | Decimal, desc: str = '', account: int = 1, created: str = None,
             debug: bool = False) \
@@ -2790,12 +3274,12 @@ class SQLModel(Model):
         target = value
         ages = []
         if self.raw_sql:
-            boxes = db.execute(f'''
+            boxes = self._exec('''
                 SELECT      id, rest, record_date
                 FROM        box
-                WHERE       account_id = {account}
+                WHERE       account_id = $account
                 ORDER BY    id DESC;
-            ''').fetchall()
+            ''', {'account': account}).fetchall()
             if debug:
                 print('boxes', boxes)
             for ref, rest, record_date in boxes:
@@ -2807,22 +3291,22 @@ class SQLModel(Model):
                     rest -= target
                     ages.append((record_date, target))
                     target = 0
-                    db.execute(f'''
+                    self._exec('''
                         UPDATE  box
-                        SET     rest = {rest}
-                        WHERE   id = {ref};
-                    ''')
+                        SET     rest = $rest
+                        WHERE   id = $ref;
+                    ''', {'rest': rest, 'ref': ref})
                     break
                 elif target > rest > 0:
                     chunk = rest
                     target -= chunk
                     ages.append((record_date, chunk))
                     rest = 0
-                    db.execute(f'''
+                    self._exec('''
                         UPDATE  box
-                        SET     rest = {rest}
-                        WHERE   id = {ref};
-                    ''')
+                        SET     rest = $rest
+                        WHERE   id = $ref;
+                    ''', {'rest': rest, 'ref': ref})
         else:
             selected_account = Account.get(id=account)
             boxes = selected_account.box.select().order_by(pony.desc(Box.id))[:]
@@ -2858,6 +3342,16 @@ class SQLModel(Model):
               created: str = None, debug: bool = False) -> str | None:
         return self._track(unscaled_value, desc, account, logging, created, debug)
 
+    @pony.db_session
+    def track_many(self, account: int, rows: list[tuple[float | int | Decimal, str, str | None]],
+                   debug: bool = False) -> list[str | None]:
+        if not self.raw_sql:
+            return [
+                self._track(unscaled_value=value, desc=desc, account=account, logging=True, created=created, debug=debug)
+                for value, desc, created in rows
+            ]
+        return self._track_many(account, [(Helper.scale(value), desc, created) for value, desc, created in rows], debug)
+
     def _track(self, unscaled_value: float | int | Decimal = 0, desc: str = '', account: int = 1, logging: bool = True,
                created: str = None, debug: bool = False) -> str | None:
         if debug:
@@ -2866,14 +3360,15 @@ class SQLModel(Model):
             created = Helper.time()
         if not isinstance(created, str):
             raise ValueError(f'The created must be a str, {type(created)} was provided.')
+        now = str(datetime.datetime.now())
         if not self._account_exists(account):
             if debug:
                 print(f"account {account} created")
             if self.raw_sql:
-                db.execute(f'''
+                self._exec('''
                     INSERT INTO account (id, hide, zakatable, created_at)
-                    VALUES({account}, 0, 1, "{str(datetime.datetime.now())}");
-                ''')
+                    VALUES($account, 0, 1, $now);
+                ''', {'account': account, 'now': now})
             else:
                 Account(
                     id=account,
@@ -2889,20 +3384,21 @@ class SQLModel(Model):
             print('creating-box', created)
         if self._box_exists(account, created):
             raise ValueError(f"The box transaction happened again in the same time({created}).")
+        self._missing_refs.discard(('box', account, created))
         if self.raw_sql:
-            db.execute(f'''
+            self._exec('''
                 INSERT INTO box (account_id, record_date, capital, count, last, rest, total, created_at)
                             VALUES(
-                                {account},
-                                "{created}",
-                                {value},
+                                $account,
+                                $created,
+                                $value,
                                 0,
                                 NULL,
-                                {value},
+                                $value,
                                 0,
-                                "{str(datetime.datetime.now())}"
+                                $now
                             );
-            ''')
+            ''', {'account': account, 'created': created, 'value': value, 'now': now})
         else:
             Box(
                 account=account,
@@ -2925,23 +3421,28 @@ class SQLModel(Model):
         if self._account_exists(account):
             file_ref = Helper.time()
             if self.raw_sql:
-                log = db.execute(f'''
+                log = self._exec('''
                         SELECT  id
                         FROM    log
-                        WHERE   record_date = "{ref}";
-                    ''').fetchone()
-                print(f'log = {log}')
+                        WHERE   record_date = $ref
+                        LIMIT   1;
+                    ''', {'ref': ref}).fetchone()
                 if log:
-                    db.execute(f'''
+                    self._exec('''
                         INSERT INTO file (log_id, record_date, path, name, created_at)
                                     VALUES(
-                                        {log[0]},
-                                        "{file_ref}",
-                                        "{path}",
-                                        "",
-                                        "{str(datetime.datetime.now())}"
+                                        $log_id,
+                                        $file_ref,
+                                        $path,
+                                        '',
+                                        $now
                                     );
-                    ''')
+                    ''', {
+                        'log_id': log[0],
+                        'file_ref': file_ref,
+                        'path': path,
+                        'now': str(datetime.datetime.now()),
+                    })
                     return file_ref
             log = Log.get(record_date=ref)
             if log:
@@ -2961,16 +3462,17 @@ class SQLModel(Model):
         if self._account_exists(account):
             if self._log_exists(account, ref):
                 if self.raw_sql:
-                    file = db.execute(f'''
+                    file = self._exec('''
                         SELECT  id
                         FROM    file
-                        WHERE   record_date = "{file_ref}";
-                    ''').fetchone()
+                        WHERE   record_date = $file_ref
+                        LIMIT   1;
+                    ''', {'file_ref': file_ref}).fetchone()
                     if file:
-                        db.execute(f'''
+                        self._exec('''
                             DELETE FROM file
-                            WHERE   id = {file[0]};
-                        ''')
+                            WHERE   id = $file_id;
+                        ''', {'file_id': file[0]})
                         return True
                     return False
                 file = File.get(record_date=file_ref)
@@ -2984,6 +3486,13 @@ class SQLModel(Model):
         return self._hide(account_id, status)
 
     def _hide(self, account_id: int, status: bool = None) -> bool:
+        if self.raw_sql and status is None:
+            account = self._exec('''
+                SELECT  hide
+                FROM    account
+                WHERE   id = $account_id;
+            ''', {'account_id': account_id}).fetchone()
+            return True if account and account[0] else False
         account = Account.get(id=account_id)
         if account:
             if status is None:
@@ -2999,17 +3508,21 @@ class SQLModel(Model):
     def _zakatable(self, account_id: int, status: bool = None) -> bool:
         if self.raw_sql:
             if status is not None:
-                db.execute(f'''
+                self._exec('''
                     UPDATE  account
-                    SET     zakatable = {1 if status else 0},
-                            updated_at = "{str(datetime.datetime.now())}"
-                    WHERE   id = {account_id};
-                ''')
-            account = db.execute(f'''
+                    SET     zakatable = $zakatable,
+                            updated_at = $now
+                    WHERE   id = $account_id;
+                ''', {
+                    'zakatable': 1 if status else 0,
+                    'now': str(datetime.datetime.now()),
+                    'account_id': account_id,
+                })
+            account = self._exec('''
                 SELECT  zakatable
                 FROM    account
-                WHERE   id = {account_id};
-            ''').fetchone()
+                WHERE   id = $account_id;
+            ''', {'account_id': account_id}).fetchone()
             if not account:
                 return False
             return True if account[0] else False
@@ -3027,6 +3540,13 @@ class SQLModel(Model):
         return self._name(account_id)
 
     def _name(self, account_id: int) -> str | None:
+        if self.raw_sql:
+            account = self._exec('''
+                SELECT  name
+                FROM    account
+                WHERE   id = $account_id;
+            ''', {'account_id': account_id}).fetchone()
+            return account[0] if account else None
         account = Account.get(id=account_id)
         if account:
             return account.name
@@ -3037,18 +3557,51 @@ class SQLModel(Model):
         return self._accounts()
 
     def _accounts(self) -> dict:
-        result = {}
         if self.raw_sql:
-            x = db.execute(f'''
+            rows = self._exec('''
                 SELECT  id, balance
-                FROM    account
-            ''')
-            for ref, balance in x.fetchall():
-                result[ref] = balance
+                FROM    account;
+            ''').fetchall()
         else:
-            for account in Account.select()[:]:
-                result[account.id] = account.balance
-        return result
+            rows = pony.select((a.id, a.balance) for a in Account)[:]
+        return {ref: balance for ref, balance in rows}
+
+    @pony.db_session
+    def accounts_with_rates(self, positive_only: bool = False, created: str = None) \
+            -> tuple[list[int], list[int], list[float]]:
+        return self._accounts_with_rates(positive_only, created)
+
+    def _accounts_with_rates(self, positive_only: bool = False, created: str = None) \
+            -> tuple[list[int], list[int], list[float]]:
+        if created is None:
+            created = Helper.time()
+        if self.raw_sql:
+            rows = self._exec(f'''
+                SELECT  a.id,
+                        a.balance,
+                        COALESCE((
+                            SELECT      e.rate
+                            FROM        exchange AS e
+                            WHERE       e.account_id = a.id     AND
+                                        e.record_date <= $created
+                            ORDER BY    e.record_date DESC
+                            LIMIT       1
+                        ), 1)
+                FROM    account AS a
+                {'WHERE   a.balance > 0' if positive_only else ''};
+            ''', {'created': created}).fetchall()
+        else:
+            rows = [
+                (account, balance, self._exchange(account, created=created)['rate'])
+                for account, balance in self._accounts().items()
+                if not positive_only or balance > 0
+            ]
+        ids, balances, rates = [], [], []
+        for account, balance, rate in rows:
+            ids.append(account)
+            balances.append(balance)
+            rates.append(rate)
+        return ids, balances, rates
 
     @pony.db_session
     def set_exchange(self, account: int, created: str = None, rate: float = None, description: str = None,
@@ -3068,16 +3621,22 @@ class SQLModel(Model):
         if not self._account_exists(account):
             self._track(account=account, debug=debug)
         if self.raw_sql:
-            db.execute(f'''
+            self._exec('''
                 INSERT INTO exchange (account_id, record_date, rate, desc, created_at)
                             VALUES(
-                                {account},
-                                "{created}",
-                                {rate},
-                                "{description if description else ''}",
-                                "{str(datetime.datetime.now())}"
+                                $account,
+                                $created,
+                                $rate,
+                                $desc,
+                                $now
                             );
-            ''')
+            ''', {
+                'account': account,
+                'created': created,
+                'rate': rate,
+                'desc': description if description else '',
+                'now': str(datetime.datetime.now()),
+            })
         else:
             Exchange(
                 account=account,
@@ -3090,6 +3649,43 @@ class SQLModel(Model):
                   f'account: {account}, created: {created}, rate:{rate}, description:{description}')
         return True
 
+    @pony.db_session
+    def set_exchanges(self, account: int, rows: list[tuple[str | None, float, str | None]], debug: bool = False) -> list[bool]:
+        return self._set_exchanges(account, rows, debug)
+
+    def _set_exchanges(self, account: int, rows: list[tuple[str | None, float, str | None]], debug: bool = False) \
+            -> list[bool]:
+        if not self.raw_sql:
+            return [
+                self._set_exchange(account, created=created, rate=rate, description=description, debug=debug)
+                for created, rate, description in rows
+            ]
+        if debug:
+            print('set_exchanges', f'rows={rows}')
+        if not isinstance(account, int):
+            raise ValueError(f'The account must be an integer, {type(account)} was provided.')
+        rows = [(Helper.time() if created is None else created, rate, description) for created, rate, description in rows]
+        result = [rate > 0 for _, rate, _ in rows]
+        if any(result):
+            if not self._account_exists(account):
+                self._track(account=account, debug=debug)
+            now = str(datetime.datetime.now())
+            self._exec_many('''
+                INSERT INTO exchange (account_id, record_date, rate, desc, created_at)
+                            VALUES($account, $created, $rate, $desc, $now);
+            ''', [
+                {
+                    'account': account,
+                    'created': created,
+                    'rate': rate,
+                    'desc': description if description else '',
+                    'now': now,
+                }
+                for created, rate, description in rows
+                if rate > 0
+            ])
+        return result
+
     @pony.db_session
     def exchange(self, account: int, created: str = None, debug: bool = False) -> dict:
         return self._exchange(account, created, debug)
@@ -3102,14 +3698,18 @@ class SQLModel(Model):
         if created is None:
             created = Helper.time()
         if self.raw_sql:
-            exchange = db.execute(f'''
-                SELECT      record_date, rate, desc
-                FROM        exchange
-                WHERE       account_id = {account}                          AND
-                            datetime(record_date) <= datetime("{created}")
-                ORDER BY    record_date DESC
-                LIMIT       1;
-            ''').fetchone()
+            exchange = self._exec('''
+                SELECT  record_date, rate, desc
+                FROM    exchange
+                WHERE   account_id = $account   AND
+                        record_date = (
+                            SELECT  MAX(record_date)
+                            FROM    exchange
+                            WHERE   account_id = $account   AND
+                                    record_date <= $created
+                        )
+                LIMIT   1;
+            ''', {'account': account, 'created': created}).fetchone()
             if debug:
                 print('valid_rates', exchange, type(exchange), exchange)
             if exchange:
@@ -3200,6 +3800,9 @@ class SQLModel(Model):
             created = Helper.time()
         (_, ages) = self._sub(unscaled_amount, desc, from_account, created, debug=debug)
         times = []
+        pending = []
+        pending_indexes = []
+        pending_seconds = set()
         source_exchange = self._exchange(from_account, created)
         target_exchange = self._exchange(to_account, created)
 
@@ -3216,13 +3819,25 @@ class SQLModel(Model):
                 print(f'old_age = {age}')
                 print(f'new_age = {new_age}')
             if self.raw_sql:
-                box = db.execute(f'''
+                # a box in the same second of the age, as a range the record_date index can seek
+                second = Helper.time_to_datetime(age).replace(microsecond=0)
+                if second in pending_seconds:
+                    # the box may be one of the pending ones, so they are written before looking it up
+                    for i, y in zip(pending_indexes, self._track_many(to_account, pending, debug=debug)):
+                        times[i] = y
+                    pending, pending_indexes, pending_seconds = [], [], set()
+                box = self._exec('''
                     SELECT  id, rest, capital
                     FROM    box
-                    WHERE   account_id = {to_account}                   AND
-                            datetime(record_date) = datetime("{age}")
-                    LIMIT   1; 
-                ''').fetchone()
+                    WHERE   account_id = $to_account    AND
+                            record_date >= $start       AND
+                            record_date < $end
+                    LIMIT   1;
+                ''', {
+                    'to_account': to_account,
+                    'start': second.isoformat(),
+                    'end': (second + datetime.timedelta(seconds=1)).isoformat(),
+                }).fetchone()
                 if debug:
                     print('box_exists', box)
                 if box:
@@ -3233,12 +3848,12 @@ class SQLModel(Model):
                     if rest + target_amount > capital:
                         capital += target_amount
                     rest += target_amount
-                    db.execute(f'''
+                    self._exec('''
                         UPDATE  box
-                        SET     capital = {capital},
-                                rest = {rest}
-                        WHERE   id = {ref};
-                    ''')
+                        SET     capital = $capital,
+                                rest = $rest
+                        WHERE   id = $ref;
+                    ''', {'capital': capital, 'rest': rest, 'ref': ref})
                     y = self._log(value=target_amount, desc=f'TRANSFER {from_account} -> {to_account}',
                                   account_id=to_account,
                                   created=None, ref=None, debug=debug)
@@ -3263,6 +3878,12 @@ class SQLModel(Model):
             if debug:
                 print(
                     f"Transfer(func) {value} from `{from_account}` to `{to_account}` (equivalent to {target_amount} `{to_account}`).")
+            if self.raw_sql:
+                pending.append((target_amount, desc, new_age))
+                pending_indexes.append(len(times))
+                pending_seconds.add(Helper.time_to_datetime(new_age).replace(microsecond=0))
+                times.append(None)
+                continue
             y = self._track(
                 unscaled_value=Helper.unscale(int(target_amount)),
                 desc=desc,
@@ -3272,22 +3893,105 @@ class SQLModel(Model):
                 debug=debug,
             )
             times.append(y)
+        for i, y in zip(pending_indexes, self._track_many(to_account, pending, debug=debug)):
+            times[i] = y
         return times
 
+    def _track_many(self, account: int, rows: list[tuple[int, str, str | None]], debug: bool = False) -> list[str | None]:
+        """
+        Tracks many scaled values of one account into new boxes with their logs, like `_track` does for one,
+        but with one account update and chunked existence checks for the whole batch.
+
+        Parameters:
+        account (int): The account to track the values into.
+        rows (list[tuple[int, str, str | None]]): The scaled value, description and created time of every box,
+            a None created time is generated like `_track` does.
+        debug (bool): Whether to print debug information. Default is False.
+
+        Returns:
+        list[str | None]: The created time of every row, or None for the rows with a zero value.
+
+        Raises:
+        ValueError: The created must be a str, <class 'xxx'> was provided.
+        """
+        if debug:
+            print('track_many', f'rows={rows}')
+        if not rows:
+            return []
+        rows = [(value, desc, Helper.time() if created is None else created) for value, desc, created in rows]
+        for _, _, created in rows:
+            if not isinstance(created, str):
+                raise ValueError(f'The created must be a str, {type(created)} was provided.')
+        now = str(datetime.datetime.now())
+        if not self._account_exists(account):
+            self._exec('''
+                INSERT INTO account (id, hide, zakatable, created_at)
+                VALUES($account, 0, 1, $now);
+            ''', {'account': account, 'now': now})
+        tracked = [(value, desc, created) for value, desc, created in rows if value != 0]
+        if tracked:
+            refs = [created for _, _, created in tracked]
+            if len(set(refs)) != len(refs):
+                # raised like the second `_track` of the same time would, before anything is written
+                seen = set()
+                for _, desc, created in tracked:
+                    if created in seen:
+                        raise ValueError(f"The log transaction('{desc}') happened again in the same time({created}).")
+                    seen.add(created)
+            for table in ('log', 'box'):
+                for i in range(0, len(refs), REFS_EXIST_CHUNK_SIZE):
+                    chunk = refs[i:i + REFS_EXIST_CHUNK_SIZE]
+                    placeholders = ', '.join(f'$(refs[{j}])' for j in range(len(chunk)))
+                    exists = self._exec(f'''
+                        SELECT  record_date
+                        FROM    {table}
+                        WHERE   account_id = $account   AND
+                                record_date IN ({placeholders})
+                        LIMIT   1;
+                    ''', {'account': account, 'refs': chunk}).fetchone()
+                    if exists:
+                        raise ValueError(f"The {table} transaction happened again in the same time({exists[0]}).")
+                self._missing_refs.difference_update((table, account, ref) for ref in refs)
+            self._exec('''
+                UPDATE  account
+                SET     balance = COALESCE(balance, 0) + $value,
+                        count = COALESCE(count, 0) + $count,
+                        updated_at = $now
+                WHERE   id = $account;
+            ''', {
+                'value': sum(value for value, _, _ in tracked),
+                'count': len(tracked),
+                'now': now,
+                'account': account,
+            })
+            self._exec_many('''
+                INSERT INTO log (account_id, record_date, value, desc, ref, created_at)
+                            VALUES($account, $created, $value, $desc, NULL, $now);
+            ''', [
+                {'account': account, 'created': created, 'value': value, 'desc': desc, 'now': now}
+                for value, desc, created in tracked
+            ])
+            self._exec_many('''
+                INSERT INTO box (account_id, record_date, capital, count, last, rest, total, created_at)
+                            VALUES($account, $created, $value, 0, NULL, $value, 0, $now);
+            ''', [
+                {'account': account, 'created': created, 'value': value, 'now': now}
+                for value, _, created in tracked
+            ])
+        return [None if value == 0 else created for value, _, created in rows]
+
     @pony.db_session
     def account_exists(self, account: int) -> bool:
         return self._account_exists(account)
 
     def _account_exists(self, account: int) -> bool:
         if self.raw_sql:
-            x = db.execute(f'''
-                SELECT  COUNT(*) > 0
+            return self._exec('''
+                SELECT  1
                 FROM    account
-                WHERE   id = {account};
-            ''').fetchone()
-            if not x:
-                return False
-            return True if x[0] else False
+                WHERE   id = $account
+                LIMIT   1;
+            ''', {'account': account}).fetchone() is not None
         return Account.exists(id=account)
 
     def files(self) -> list[dict[str, str | int]]:
@@ -3324,7 +4028,21 @@ class SQLModel(Model):
         if not isinstance(account_id, int):
             raise ValueError(f'The account must be an integer, {type(account_id)} was provided.')
         if cached:
-            return Account.get(id=account_id).balance
+            if self.raw_sql:
+                x = self._exec('''
+                    SELECT  balance
+                    FROM    account
+                    WHERE   id = $account_id;
+                ''', {'account_id': account_id}).fetchone()
+                return x[0] if x else 0
+            account = Account.get(id=account_id)
+            return account.balance if account else 0
+        if self.raw_sql:
+            return self._exec('''
+                SELECT  COALESCE(SUM(rest), 0)
+                FROM    box
+                WHERE   account_id = $account_id;
+            ''', {'account_id': account_id}).fetchone()[0]
         return pony.sum(b.rest for b in Box if b.account.id == account_id)
 
     @pony.db_session
@@ -3332,6 +4050,14 @@ class SQLModel(Model):
         return self._box_size(account_id)
 
     def _box_size(self, account_id: int) -> int:
+        if self.raw_sql:
+            if not self._account_exists(account_id):
+                return -1
+            return self._exec('''
+                SELECT  COUNT(*)
+                FROM    box
+                WHERE   account_id = $account_id;
+            ''', {'account_id': account_id}).fetchone()[0]
         account = Account.get(id=account_id)
         if account:
             return len(account.box)
@@ -3342,17 +4068,45 @@ class SQLModel(Model):
         return self._log_size(account_id)
 
     def _log_size(self, account_id: int) -> int:
+        if self.raw_sql:
+            if not self._account_exists(account_id):
+                return -1
+            return self._exec('''
+                SELECT  COUNT(*)
+                FROM    log
+                WHERE   account_id = $account_id;
+            ''', {'account_id': account_id}).fetchone()[0]
         account = Account.get(id=account_id)
         if account:
             return len(account.log)
         return -1
 
+    @pony.db_session
+    def log_total(self, account_id: int) -> int:
+        return self._log_total(account_id)
+
+    def _log_total(self, account_id: int) -> int:
+        if self.raw_sql:
+            return self._exec('''
+                SELECT  COALESCE(SUM(value), 0)
+                FROM    log
+                WHERE   account_id = $account_id;
+            ''', {'account_id': account_id}).fetchone()[0]
+        return pony.sum(l.value for l in Log if l.account.id == account_id)
+
     def save(self, path: str = None) -> bool:
         if path is None:
             path = self.path()
         db.commit()
         if path != self._db_path and self._db_path:
-            shutil.copy(self._db_path, path)
+            # committed pages may still live in the WAL journal, so copy through SQLite instead of the file
+            source = sqlite3.connect(self._db_path)
+            target = sqlite3.connect(path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
         return True
 
     def load(self, path: str = None) -> bool:
@@ -3366,8 +4120,27 @@ class SQLModel(Model):
         return False
 
     def reset(self) -> None:
-        db.drop_all_tables(with_all_data=True)
-        db.create_tables()
+        if self.provider == 'sqlite':
+            self._clear_tables()
+        else:
+            db.drop_all_tables(with_all_data=True)
+            db.create_tables()
+        self._missing_refs.clear()
+
+    @pony.db_session
+    def _clear_tables(self) -> None:
+        """
+        Empties every table and restarts their ids, keeping the schema in place.
+
+        It resets SQLite the same way dropping and creating the tables does, without rebuilding
+        the tables and their indexes each time.
+
+        Returns:
+        None
+        """
+        for table in RESET_TABLES:
+            self._exec(f'DELETE FROM {table};')
+        self._exec('DELETE FROM sqlite_sequence;')
 
     @pony.db_session
     def check(self,
@@ -3399,11 +4172,8 @@ class SQLModel(Model):
         now = Helper.time() if now is None else now
         if debug:
             print(f'now = [{now}]')
-        now_ms = Helper.time_to_milliseconds(now)
         if not self.raw_sql:
             raise Exception('Not Implemented')
-        if debug:
-            print(f'now_ms = [{now_ms}]')
         if cycle is None:
             cycle = Helper.TimeCycle()
         if unscaled_nisab is None:
@@ -3413,22 +4183,28 @@ class SQLModel(Model):
         below_nisab = 0
         brief = [0, 0, 0]
         valid = False
-        boxes = db.execute(f'''
+        now_ms = Helper.time_to_milliseconds(now)
+        if debug:
+            print(f'now_ms = [{now_ms}]')
+        boxes = self._exec('''
             SELECT      b.id, b.rest, b.record_date, b.last, b.account_id, b.capital, b.total, b.count, l.desc
             From        box AS b
-            LEFT JOIN   log AS l ON l.record_date = b.record_date 
+            LEFT JOIN   log AS l ON l.record_date = b.record_date
             WHERE       b.rest > 0										AND
-                        datetime(b.record_date) <= datetime("{now}")
+                        b.record_date <= $now
             ORDER BY	b.record_date DESC;
-        ''').fetchall()
+        ''', {'now': now}).fetchall()
         if debug:
             print(f'boxes = {boxes}')
         index = 0
+        exchanges = {}  # account: its current exchange, the same for all of its boxes
         for ref, rest, record_date, last, account_id, capital, box_total, count, desc in boxes:
             if debug:
                 print(
                     f'ref = {ref}, rest = {rest}, record_date = {record_date}, last = {last}, account_id = {account_id}, capital = {capital}, total = {box_total}, count = {count}, desc = {desc}')
-            exchange = self.exchange(account_id, debug=debug)
+            if account_id not in exchanges:
+                exchanges[account_id] = self.exchange(account_id, debug=debug)
+            exchange = exchanges[account_id]
             if debug:
                 print(f'exchange <=> {exchange}')
             rest = Helper.exchange_calc(rest, float(exchange['rate']), 1)
@@ -3450,9 +4226,7 @@ class SQLModel(Model):
             brief[1] += rest
             x = account_id
             if rest >= nisab:
-                total = 0
-                for _ in range(epoch):
-                    total += Helper.ZakatCut(float(rest) - float(total))
+                total = Helper.ZakatCutCycles(float(rest), epoch)
                 if total > 0:
                     if x not in plan:
                         plan[x] = {}
@@ -3536,15 +4310,20 @@ class SQLModel(Model):
             print('######### zakat #######')
             print('parts_exist', parts_exist)
         report_time = Helper.time()
-        db.execute(f'''
+        now = str(datetime.datetime.now())
+        self._exec('''
             INSERT INTO report(record_date, details, created_at)
                         VALUES(
-                            "{report_time}",
-                            '{json.dumps(report)}',
-                            "{str(datetime.datetime.now())}"
+                            $report_time,
+                            $details,
+                            $now
                         );
-        ''')
+        ''', {'report_time': report_time, 'details': JSONEncoder.dumps(report), 'now': now})
         created = Helper.time()
+        box_updates = []
+        box_rest_updates = []
+        log_rows = []
+        account_totals = {}
         for x, boxes in plan.items():
             target_exchange = self.exchange(x, debug=debug)
             if debug:
@@ -3554,21 +4333,55 @@ class SQLModel(Model):
                 if debug:
                     print('i', index, 'box', box)
                 amount = Helper.exchange_calc(float(box['total']), 1, float(target_exchange['rate']))
-                db.execute(f'''
-                    UPDATE  box
-                    SET     last = "{created}",
-                            total = total + {amount},
-                            count = count + {box['count']}
-                    WHERE   id = {box['ref']};
-                ''')
+                box_updates.append({
+                    'created': created,
+                    'amount': amount,
+                    'count': box['count'],
+                    'ref': box['ref'],
+                })
                 if not parts_exist:
-                    db.execute(f'''
-                        UPDATE  box
-                        SET     rest = rest - {box['box_rest']}
-                        WHERE   id = {box['ref']};
-                    ''')
-                    self.log(-float(amount), desc='zakat-زكاة', account_id=x, created=None, ref=box['box_time'],
-                             debug=debug)
+                    box_rest_updates.append({
+                        'rest': box['box_rest'],
+                        'ref': box['ref'],
+                    })
+                    log_rows.append({
+                        'account_id': x,
+                        'value': -float(amount),
+                        'desc': 'zakat-زكاة',
+                        'ref': box['box_time'],
+                        'now': now,
+                    })
+                    if x not in account_totals:
+                        account_totals[x] = {'account_id': x, 'value': 0, 'count': 0, 'now': now}
+                    account_totals[x]['value'] -= float(amount)
+                    account_totals[x]['count'] += 1
+        # the times are fresh and strictly increasing, the unique record_date column guards the rest
+        for row, log_created in zip(log_rows, Helper.times(len(log_rows))):
+            row['created'] = log_created
+            self._missing_refs.discard(('log', row['account_id'], log_created))
+        self._exec_many('''
+            UPDATE  account
+            SET     balance = COALESCE(balance, 0) + $value,
+                    count = COALESCE(count, 0) + $count,
+                    updated_at = $now
+            WHERE   id = $account_id;
+        ''', list(account_totals.values()))
+        self._exec_many('''
+            INSERT INTO log (account_id, record_date, value, desc, ref, created_at)
+                        VALUES($account_id, $created, $value, $desc, $ref, $now);
+        ''', log_rows)
+        self._exec_many('''
+            UPDATE  box
+            SET     last = $created,
+                    total = total + $amount,
+                    count = count + $count
+            WHERE   id = $ref;
+        ''', box_updates)
+        self._exec_many('''
+            UPDATE  box
+            SET     rest = rest - $rest
+            WHERE   id = $ref;
+        ''', box_rest_updates)
         if parts_exist:
             for account, part in parts['account'].items():
                 if part['part'] == 0:
@@ -3591,7 +4404,7 @@ class SQLModel(Model):
         ext_len = len(ext)
         if path.endswith(f'.{ext}'):
             path = path[:-ext_len - 1]
-        _, filename = os.path.split(f'{path}.import_csv.{ext}.camel')
+        _, filename = os.path.split(f'{path}.import_csv.{ext}.hashes')
         return f'{self._base_path}/{filename}'
 
     def daily_logs(self, weekday: WeekDay = WeekDay.Friday, debug: bool = False):
@@ -3603,9 +4416,8 @@ class SQLModel(Model):
         }
 
     def export_json(self, path: str = "data.json") -> bool:
-        with open(path, "w") as file:
-            json.dump(self.vault(), file, indent=4, cls=JSONEncoder)
-            return True
+        JSONEncoder.dump(self.vault(), path)
+        return True
 
     @pony.db_session()
     def vault(self, section: Vault = Vault.ALL) -> dict:
@@ -3617,7 +4429,7 @@ class SQLModel(Model):
         if section == Vault.ACCOUNT or all:
             for k, v in {
                 a.id: a.to_dict(with_lazy=True, with_collections=True, related_objects=True)
-                for a in Account.select()[:]
+                for a in Account.select().prefetch(Account.box, Account.log, Account.exchange, Log.file)[:]
             }.items():
                 account[k] = v
                 if v['box']:
@@ -3647,7 +4459,10 @@ class SQLModel(Model):
                 name[v['name']] = k
 
         if section == Vault.REPORT or all:
-            report = Report.select()[:]
+            report = {
+                record_date: details
+                for record_date, details in pony.select((r.record_date, r.details) for r in Report)[:]
+            }
 
         if section == Vault.ACCOUNT:
             return account
@@ -3682,14 +4497,19 @@ class SQLModel(Model):
             created = Helper.time()
         if not isinstance(created, str):
             raise ValueError(f'The created must be a str, {type(created)} was provided.')
+        now = str(datetime.datetime.now())
         if self.raw_sql:
-            db.execute(f'''
+            self._exec('''
                 UPDATE  account
-                SET     balance = COALESCE(balance, 0) + {value},
+                SET     balance = COALESCE(balance, 0) + $value,
                         count = COALESCE(count, 0) + 1,
-                        updated_at = "{str(datetime.datetime.now())}"
-                WHERE   id = {account_id};
-            ''')
+                        updated_at = $now
+                WHERE   id = $account_id;
+            ''', {
+                'value': value,
+                'now': now,
+                'account_id': account_id,
+            })
         else:
             account = Account.get(id=account_id)
             if account:
@@ -3704,18 +4524,26 @@ class SQLModel(Model):
             raise ValueError(f"The log transaction('{desc}') happened again in the same time({created}).")
         if debug:
             print('created-log', created)
+        self._missing_refs.discard(('log', account_id, created))
         if self.raw_sql:
-            db.execute(f'''
+            self._exec('''
                 INSERT INTO log (account_id, record_date, value, desc, ref, created_at)
                             VALUES(
-                                {account_id},
-                                "{created}",
-                                {value},
-                                "{desc}",
-                                {f'"{ref}"' if ref else 'NULL'},
-                                "{str(datetime.datetime.now())}"
+                                $account_id,
+                                $created,
+                                $value,
+                                $desc,
+                                $ref,
+                                $now
                             );
-            ''')
+            ''', {
+                'account_id': account_id,
+                'created': created,
+                'value': value,
+                'desc': desc,
+                'ref': ref if ref else None,
+                'now': now,
+            })
         else:
             Log(
                 account=account_id,
@@ -3730,32 +4558,47 @@ class SQLModel(Model):
     def ref_exists(self, account_id: int, ref_type: str, ref: str) -> bool:
         if not isinstance(account_id, int):
             raise ValueError(f'The account_id must be an integer, {type(account_id)} was provided.')
-        match ref_type:
-            case 'box':
-                if self.raw_sql:
-                    box = db.execute(f'''
-                        SELECT  COUNT(*)
-                        FROM    box
-                        WHERE   account_id = {account_id}   AND
-                                record_date = "{ref}";
-                    ''').fetchone()
-                    if not box:
-                        return False
-                    return box[0] > 0
-                return Box.exists(account=account_id, record_date=ref)
-            case 'log':
-                if self.raw_sql:
-                    log = db.execute(f'''
-                        SELECT  COUNT(*)
-                        FROM    log
-                        WHERE   account_id = {account_id}   AND
-                                record_date = "{ref}";
-                    ''').fetchone()
-                    if not log:
-                        return False
-                    return log[0] > 0
-                return Log.exists(account=account_id, record_date=ref)
-        return False
+        if (ref_type, account_id, ref) in self._missing_refs:
+            return False
+        if ref_type not in REF_TABLES:
+            return False
+        sql, entity = REF_TABLES[ref_type]
+        if self.raw_sql:
+            return self._exec(sql, {'account_id': account_id, 'ref': ref}).fetchone() is not None
+        return entity.exists(account=account_id, record_date=ref)
+
+    @pony.db_session
+    def refs_exist(self, account_id: int, ref_type: str, refs: list[str]) -> set[str]:
+        return self._refs_exist(account_id, ref_type, refs)
+
+    def _refs_exist(self, account_id: int, ref_type: str, refs: list[str]) -> set[str]:
+        if not isinstance(account_id, int):
+            raise ValueError(f'The account_id must be an integer, {type(account_id)} was provided.')
+        if ref_type not in REF_TABLES:
+            return set()
+        refs = list(refs)
+        result = set()
+        for i in range(0, len(refs), REFS_EXIST_CHUNK_SIZE):
+            chunk = refs[i:i + REFS_EXIST_CHUNK_SIZE]
+            if self.raw_sql:
+                placeholders = ', '.join(f'$(refs[{j}])' for j in range(len(chunk)))
+                rows = self._exec(f'''
+                    SELECT  record_date
+                    FROM    {ref_type}
+                    WHERE   account_id = $account_id    AND
+                            record_date IN ({placeholders});
+                ''', {'account_id': account_id, 'refs': chunk}).fetchall()
+                # SQLite returns the stored text, other drivers may return datetime objects
+                result.update(
+                    row[0].isoformat() if isinstance(row[0], datetime.datetime) else str(row[0])
+                    for row in rows
+                )
+                continue
+            result.update(ref for ref in chunk if self.ref_exists(account_id, ref_type, ref))
+        # only SQLite is known to give back the refs exactly as they were bound, so only it caches the misses
+        if self.provider == 'sqlite':
+            self._missing_refs.update((ref_type, account_id, ref) for ref in refs if ref not in result)
+        return result
 
     @pony.db_session
     def box_exists(self, account_id: int, ref: str) -> bool:
@@ -3877,22 +4720,23 @@ class ZakatTracker:
             'total': float,
         }
         """
-        total = 0
         parts = {
             'account': {},
             'exceed': False,
             'demand': int(round(scaled_demand)),
         }
-        for x, y in self.db.accounts().items():
-            if positive_only and y <= 0:
-                continue
-            total += float(y)
-            exchange = self.db.exchange(account=x, debug=debug)
-            parts['account'][x] = {'balance': y, 'rate': exchange['rate'], 'part': 0}
-        parts['total'] = total
+        ids, balances, rates = self.db.accounts_with_rates(positive_only=positive_only)
+        if debug:
+            print('build_payment_parts', ids, balances, rates)
+        parts['account'] = {
+            x: {'balance': y, 'rate': rate, 'part': 0}
+            for x, y, rate in zip(ids, balances, rates)
+        }
+        parts['total'] = float(sum(balances))
         return parts
 
-    def import_csv(self, path: str = 'file.csv', scale_decimal_places: int = 0, debug: bool = False) -> tuple:
+    def import_csv(self, path: str = 'file.csv', scale_decimal_places: int = 0, debug: bool = False,
+                   batch_size: int = IMPORT_CSV_BATCH_SIZE) -> tuple:
         """
         The function reads the CSV file, checks for duplicate transactions, and creates the transactions in the system.
 
@@ -3900,11 +4744,15 @@ class ZakatTracker:
         path (str): The path to the CSV file. Default is 'file.csv'.
         scale_decimal_places (int): The number of decimal places to scale the value. Default is 0.
         debug (bool): A flag indicating whether to print debug information.
+        batch_size (int): The number of tracked rows buffered before writing them together. Default is 1000.
 
         Returns:
         tuple: A tuple containing the number of transactions created, the number of transactions found in the cache,
                 and a dictionary of bad transactions.
 
+        Raises:
+        ValueError: The batch_size must be positive, xxx was provided.
+
         Notes:
             * Currency Pair Assumption: This function assumes that the exchange rates stored for each account
                                         are appropriate for the currency pairs involved in the conversions.
@@ -3922,12 +4770,22 @@ class ZakatTracker:
         """
         if debug:
             print('import_csv', f'debug={debug}')
-        cache: list[int] = []
+        if batch_size < 1:
+            raise ValueError(f'The batch_size must be positive, {batch_size} was provided.')
+        cache_path = self.db.import_csv_cache_path()
+        cache: set[int] = set()
         try:
-            with open(self.db.import_csv_cache_path(), 'r') as stream:
-                cache = camel.load(stream.read())
+            with open(cache_path, 'rb') as stream:
+                hashes = array('q')
+                data = stream.read()
+                # a torn last record of an interrupted append is ignored
+                hashes.frombytes(data[:len(data) - len(data) % hashes.itemsize])
+                if sys.byteorder == 'big':
+                    hashes.byteswap()
+                cache = set(hashes)
         except:
             pass
+        fresh: list[int] = []
         date_formats = [
             "%Y-%m-%d %H:%M:%S",
             "%Y-%m-%dT%H:%M:%S",
@@ -3936,14 +4794,19 @@ class ZakatTracker:
         ]
         created, found, bad = 0, 0, {}
         data: dict[int, list] = {}
+        seen: set[int] = set()
+        parsed_dates: dict[str, str] = {}  # raw date: Helper.time()
         with open(path, newline='', encoding="utf-8") as f:
             i = 0
             for row in csv.reader(f, delimiter=','):
                 i += 1
-                hashed = hash(tuple(row))
-                if hashed in cache:
+                # hashed on the parsed record, so a quoted field spanning several lines stays one row,
+                # and json-encoded, so the field boundaries stay part of what is hashed
+                hashed = Helper.stable_hash(json.dumps(row).encode('utf-8'))
+                if hashed in cache or hashed in seen:
                     found += 1
                     continue
+                seen.add(hashed)
                 account = row[0]
                 desc = row[1]
                 value = float(row[2])
@@ -3951,12 +4814,23 @@ class ZakatTracker:
                 if row[4:5]:  # Empty list if index is out of range[]
                     rate = float(row[4])
                 date: int = 0
-                for time_format in date_formats:
-                    try:
-                        date = Helper.time(datetime.datetime.strptime(row[3], time_format))
-                        break
-                    except:
-                        pass
+                if row[3] in parsed_dates:
+                    date = parsed_dates[row[3]]
+                else:
+                    matched = CSV_DATE_PATTERN.fullmatch(row[3])
+                    if matched:
+                        try:
+                            date = Helper.time(datetime.datetime(*(int(x) for x in matched.groups() if x is not None)))
+                        except ValueError:
+                            pass
+                    if not date:
+                        for time_format in date_formats:
+                            try:
+                                date = Helper.time(datetime.datetime.strptime(row[3], time_format))
+                                break
+                            except:
+                                pass
+                    parsed_dates[row[3]] = date
                 # TODO: not allowed for negative dates in the future after enhance time functions
                 if date == 0 or date == '' or date is None:
                     bad[i] = row + ['invalid date']
@@ -3973,12 +4847,54 @@ class ZakatTracker:
         if bad:
             return created, found, bad
 
+        # every account is resolved on its first row, in date order, and its already logged transactions
+        # are fetched then in one query, so duplicates are detected without a lookup per row
+        dates: dict[str, list[str]] = {}  # account name: the dates of its single rows
+        for rows in data.values():
+            if len(rows) == 1:
+                (_, account, _, _, date, _, _) = rows[0]
+                dates.setdefault(account, []).append(date)
+        accounts: dict[str, int] = {}
+        existing: dict[int, set[str]] = {}
+
+        # positive rows only add boxes, so they are buffered per account and written together,
+        # and the buffer is flushed before anything that depends on them (sub, transfer)
+        batch: dict[int, list[tuple]] = {}  # account: [(value, desc, date, row)]
+        batched = 0
+
+        def persist() -> None:
+            # the cache is append-only, so only the hashes not written yet are appended
+            with open(cache_path, 'ab') as stream:
+                hashes = array('q', fresh)
+                if sys.byteorder == 'big':
+                    hashes.byteswap()
+                hashes.tofile(stream)
+            fresh.clear()
+
+        def flush() -> None:
+            nonlocal created, batched
+            while batch:
+                account_ref, tracks = next(iter(batch.items()))
+                self.db.track_many(account_ref, [(value, desc, date) for value, desc, date, _ in tracks])
+                del batch[account_ref]
+                created += len(tracks)
+                fresh.extend(row[-1] for _, _, _, row in tracks)
+            batched = 0
+            # written through once enough piled up, so an interrupted import keeps the rows it committed
+            if len(fresh) >= batch_size:
+                persist()
+
         for date, rows in sorted(data.items()):
             try:
                 len_rows = len(rows)
                 if len_rows == 1:
                     (_, account, desc, unscaled_value, date, rate, hashed) = rows[0]
-                    account_ref, _ = self.db.account(name=account)
+                    if account not in accounts:
+                        accounts[account], _ = self.db.account(name=account)
+                        existing[accounts[account]] = self.db.refs_exist(accounts[account], 'log', dates[account])
+                    account_ref = accounts[account]
+                    if date in existing[account_ref]:
+                        raise ValueError(f"The log transaction('{desc}') happened again in the same time({date}).")
                     value = Helper.unscale(
                         unscaled_value,
                         decimal_places=scale_decimal_places,
@@ -3986,12 +4902,18 @@ class ZakatTracker:
                     if rate > 0:
                         self.db.set_exchange(account=account_ref, created=date, rate=rate)
                     if value > 0:
-                        self.db.track(unscaled_value=value, desc=desc, account=account_ref, logging=True, created=date)
-                    elif value < 0:
+                        batch.setdefault(account_ref, []).append((value, desc, date, rows[0]))
+                        batched += 1
+                        if batched >= batch_size:
+                            flush()
+                        continue
+                    if value < 0:
+                        flush()
                         self.db.sub(unscaled_value=-value, desc=desc, account=account_ref, created=date)
                     created += 1
-                    cache.append(hashed)
+                    fresh.append(hashed)
                     continue
+                flush()
                 if debug:
                     print('-- Duplicated time detected', date, 'len', len_rows)
                     print(rows)
@@ -4031,11 +4953,22 @@ class ZakatTracker:
                     created=date1,
                 )
             except Exception as e:
-                for (i, account, desc, value, row_date, rate, _) in rows:
+                failed = list(rows)
+                try:
+                    flush()
+                except Exception:
+                    failed = [row for tracks in batch.values() for _, _, _, row in tracks] + failed
+                for (i, account, desc, value, row_date, rate, _) in failed:
                     bad[i] = (account, desc, value, row_date, rate, e)
                 break
-        with open(self.db.import_csv_cache_path(), 'w') as stream:
-            stream.write(camel.dump(cache))
+        else:
+            try:
+                flush()
+            except Exception as e:
+                for tracks in batch.values():
+                    for _, _, _, (i, account, desc, value, row_date, rate, _) in tracks:
+                        bad[i] = (account, desc, value, row_date, rate, e)
+        persist()
         return created, found, bad
 
     ########
@@ -4080,28 +5013,33 @@ class ZakatTracker:
         """
         if debug:
             print('generate_random_csv_file', f'debug={debug}')
-        i = 0
-        with open(path, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile)
+        # the dates are built from day ordinals instead of datetime arithmetic and strftime, and the rows
+        # are streamed to a single writerows call, drawing the random values in the same order as before,
+        # so seeded runs keep generating the same file
+        start = datetime.date(1000, 1, 1)
+        days = (datetime.date(2023, 12, 31) - start).days
+        start = start.toordinal()
+        count = max(count, 0)
+
+        def rows():
             for i in range(count):
-                account = f"acc-{random.randint(1, 1000)}"
-                desc = f"Some text {random.randint(1, 1000)}"
-                value = random.randint(1000, 100000)
-                date = ZakatTracker.generate_random_date(datetime.datetime(1000, 1, 1),
-                                                         datetime.datetime(2023, 12, 31)).strftime("%Y-%m-%d %H:%M:%S")
+                row = [
+                    f"acc-{random.randint(1, 1000)}",
+                    f"Some text {random.randint(1, 1000)}",
+                    random.randint(1000, 100000),
+                    f'{datetime.date.fromordinal(start + random.randrange(days)).isoformat()} 00:00:00',
+                ]
                 if not i % 13 == 0:
-                    value *= -1
-                row = [account, desc, value, date]
+                    row[2] *= -1
                 if with_rate:
-                    rate = random.randint(1, 100) * 0.12
-                    if debug:
-                        print('before-append', row)
-                    row.append(rate)
-                    if debug:
-                        print('after-append', row)
-                writer.writerow(row)
-                i = i + 1
-        return i
+                    row.append(random.randint(1, 100) * 0.12)
+                yield row
+
+        with open(path, "w", newline="") as csvfile:
+            csv.writer(csvfile).writerows(rows())
+        if debug:
+            print('generate_random_csv_file', f'rows={count}')
+        return count
 
     @staticmethod
     def create_random_list(max_sum, min_value=0, max_value=10):
@@ -4172,6 +5110,25 @@ class ZakatTracker:
             assert account_zz_ref == 321
             assert account_zz_name == 'zz'
             assert account_zzz_name_new not in self.db.vault(Vault.NAME)['account']
+
+            # reference lookups must seek the unique record_date index instead of scanning the table
+            if isinstance(self.db, SQLModel) and db.provider.dialect == 'SQLite':
+                with pony.db_session:
+                    for table, (sql, _) in REF_TABLES.items():
+                        plan = db.execute(
+                            f'EXPLAIN QUERY PLAN {sql}', {}, {'account_id': account_z_ref, 'ref': Helper.time()},
+                        ).fetchall()
+                        if debug:
+                            print('plan', plan)
+                        assert plan
+                        assert all(
+                            row[-1].startswith('SEARCH')
+                            and f'USING INDEX sqlite_autoindex_{table}_' in row[-1]
+                            and row[-1].endswith('(record_date=?)')
+                            for row in plan
+                        ), plan
+                # a reset must empty every table of the schema
+                assert set(RESET_TABLES) == {entity._table_ for entity in db.entities.values()}
             account_xx_ref, account_xx_name = self.db.account(name='xx', ref=333)
             assert self.db.account_exists(account_xx_ref)
             assert account_xx_ref == 333
@@ -4299,6 +5256,7 @@ class ZakatTracker:
                         if debug:
                             print('_sub', z, Helper.time())
                     assert ref is not None
+                    assert self.db.refs_exist(x, 'log', [ref, '1900-01-01T00:00:00']) == {ref}
                     assert len(self.db.vault(Vault.ACCOUNT)[x]['log'][ref]['file']) == 0
                     for i in range(3):
                         file_ref = self.db.add_file(x, ref, 'file_' + str(i))
@@ -4315,6 +5273,9 @@ class ZakatTracker:
                     for k, v in daily_logs.items():
                         assert k
                         assert v
+                    if isinstance(self.db, DictModel):
+                        # every period groups the same logs, so they all add up to the same total
+                        assert len({sum(v['total'] for v in period.values()) for period in daily_logs.values()}) == 1
                     z = self.db.balance(x)
                     if debug:
                         print("debug-0", z, y)
@@ -4324,9 +5285,8 @@ class ZakatTracker:
                         print("debug-1", z, y['fresh_balance'])
                     assert z == y['fresh_balance']
                     o = self.db.vault(Vault.ACCOUNT)[x]['log']
-                    z = 0
-                    for i in o:
-                        z += o[i]['value']
+                    z = sum(v['value'] for v in o.values())
+                    assert self.db.log_total(x) == z
                     if debug:
                         print("debug-2", z, type(z))
                         print("debug-2", y['log_value_sum'], type(y['log_value_sum']))
@@ -4459,6 +5419,26 @@ class ZakatTracker:
                         print(f'exchange = {result}')
                     assert result['rate'] != 1
 
+            # many exchanges at once
+
+            account_batch_ref, _ = self.db.account(name='test-negative-to-positive-batch')
+
+            rates = [x * 0.12 for x in range(-15, 21)]
+            rows = [(created, i, f"range({i})") for created, i in zip(Helper.times(len(rates)), rates)]
+            assert self.db.set_exchanges(account_batch_ref, rows, debug=debug) == [i > 0 for i in rates]
+            for created, i, _ in rows:
+                result = self.db.exchange(account_batch_ref, created=created, debug=debug)
+                if debug:
+                    print(f'exchange = {result}')
+                if i <= 0:
+                    assert result['rate'] == 1
+                else:
+                    assert result['rate'] == i
+            assert self.db.set_exchanges(account_batch_ref, [], debug=debug) == []
+            assert self.db.set_exchanges(account_batch_ref, [(None, 0, None)], debug=debug) == [False]
+            assert self.db.set_exchanges(account_batch_ref, [(None, 7.5, 'now')], debug=debug) == [True]
+            assert self.db.exchange(account_batch_ref, created=Helper.time(), debug=debug)['rate'] == 7.5
+
             # اختبار النتائج باستخدام التواريخ بالنانو ثانية
             for i in range(1, 31):
                 timestamp_ns = Helper.day_to_time(i)
@@ -4548,7 +5528,7 @@ class ZakatTracker:
                 },
             }
 
-            selected_time = Helper.datetime_to_milliseconds(Helper.time_to_datetime(Helper.time())) - Helper.TimeCycle()
+            selected_time = Helper.time_to_milliseconds(Helper.time()) - Helper.TimeCycle()
             account_ages_ref, _ = self.db.account(name='ages')
             account_future_ref, _ = self.db.account(name='future')
 
@@ -4598,15 +5578,16 @@ class ZakatTracker:
                 assert future_fresh_balance == total
 
                 # TODO: check boxes times for `ages` should equal box times in `future`
-                for ref in self.db.vault(Vault.ACCOUNT)[account_ages_ref]['box']:
-                    ages_capital = self.db.vault(Vault.ACCOUNT)[account_ages_ref]['box'][ref]['capital']
-                    ages_rest = self.db.vault(Vault.ACCOUNT)[account_ages_ref]['box'][ref]['rest']
+                accounts = self.db.vault(Vault.ACCOUNT)
+                future_boxes = accounts[account_future_ref]['box']
+                for ref, ages_box in accounts[account_ages_ref]['box'].items():
+                    ages_capital = ages_box['capital']
+                    ages_rest = ages_box['rest']
                     future_capital = 0
-                    if ref in self.db.vault(Vault.ACCOUNT)[account_future_ref]['box']:
-                        future_capital = self.db.vault(Vault.ACCOUNT)[account_future_ref]['box'][ref]['capital']
                     future_rest = 0
-                    if ref in self.db.vault(Vault.ACCOUNT)[account_future_ref]['box']:
-                        future_rest = self.db.vault(Vault.ACCOUNT)[account_future_ref]['box'][ref]['rest']
+                    if ref in future_boxes:
+                        future_capital = future_boxes[ref]['capital']
+                        future_rest = future_boxes[ref]['rest']
                     if ages_capital != 0 and future_capital != 0 and future_rest != 0:
                         if debug:
                             print('================================================================')
@@ -4660,10 +5641,7 @@ class ZakatTracker:
                 assert self.db.balance(x, False) == z[4]
                 assert xx == z[4]
 
-                s = 0
-                log = self.db.vault(Vault.ACCOUNT)[x]['log']
-                for i in log:
-                    s += log[i]['value']
+                s = self.db.log_total(x)
                 if debug:
                     print('s', s, 'z[5]', z[5])
                 assert s == z[5]
@@ -4677,11 +5655,7 @@ class ZakatTracker:
                 assert self.db.balance(y, False) == z[9]
                 assert yy == z[9]
 
-                s = 0
-                log = self.db.vault(Vault.ACCOUNT)[y]['log']
-                for i in log:
-                    s += log[i]['value']
-                assert s == z[10]
+                assert self.db.log_total(y) == z[10]
 
                 assert self.db.box_size(y) == z[11]
                 assert self.db.log_size(y) == z[12]
@@ -4691,40 +5665,154 @@ class ZakatTracker:
 
             # storage
 
-            _path = self.db.path(f'./zakat_test_db/test.{self.db.ext()}')
-            if os.path.exists(_path):
-                os.remove(_path)
-            self.db.save()
-            assert os.path.getsize(_path) > 0
+            # a server database (ext() is None) has no file to save to, it is only committed
+            if self.db.ext() is None:
+                assert self.db.save()
+            else:
+                _path = self.db.path(str(Path(self.db.path()).with_name(f'test.{self.db.ext()}')))
+                Path(_path).unlink(missing_ok=True)
+                self.db.save()
+                assert os.path.getsize(_path) > 0
             self.db.reset()
             self.db.load()
             assert self.db.vault(Vault.ACCOUNT) is not None
 
+            # csv dates, the pattern only accepts dates the strptime formats accept too, and parses them the same
+
+            for raw, fast, accepted in (
+                ('2024-01-02', True, True),
+                ('2024-01-02 10:20:30', True, True),
+                ('2024-01-02T10:20:30', True, True),
+                ('2024-01-02T102030', True, True),
+                ('2024-01-02  10:20:30', False, True),  # strptime matches any whitespace
+                ('2024-1-2', False, True),  # strptime allows one digit months and days
+                ('2024-01-02 102030', False, False),
+                ('2024-01-02T10:2030', False, False),
+                ('2024-01-02T1020:30', False, False),
+                ('2024-01-02 10:20', False, False),
+                ('2024-01-02T10', False, False),
+                ('2024-01-02 ', False, False),
+                ('2024-01-02\n', False, False),
+                ('2024/01/02', False, False),
+                ('24-01-02', False, False),
+            ):
+                matched = CSV_DATE_PATTERN.fullmatch(raw)
+                assert (matched is not None) is fast, raw
+                parsed = None
+                for time_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H%M%S", "%Y-%m-%d"):
+                    try:
+                        parsed = datetime.datetime.strptime(raw, time_format)
+                        break
+                    except ValueError:
+                        pass
+                assert (parsed is not None) is accepted, raw
+                if matched:
+                    assert datetime.datetime(*(int(x) for x in matched.groups() if x is not None)) == parsed
+
+            # csv record with a quoted multi-line description
+
+            csv_path = f'test-import_csv-multiline-{self.db.ext()}.csv'
+            with open(csv_path, 'w', newline='', encoding='utf-8') as stream:
+                csv.writer(stream).writerows([
+                    ['multiline', 'first\nsecond', 10, '2024-01-01 10:20:30'],
+                    ['multiline', 'third', 5, '2024-01-02 10:20:30'],
+                ])
+            Path(self.db.import_csv_cache_path()).unlink(missing_ok=True)
+            self.db.reset()
+            assert self.import_csv(csv_path) == (2, 0, {})
+            account_ref, _ = self.db.account(name='multiline')
+            descs = sorted(str(log['desc']) for log in self.db.vault(Vault.ACCOUNT)[account_ref]['log'].values())
+            assert descs == ['first\nsecond', 'third']
+            assert self.import_csv(csv_path) == (0, 2, {})
+            Path(csv_path).unlink()
+
+            # csv records whose fields only differ in where they split are still different records
+
+            csv_path = f'test-import_csv-boundaries-{self.db.ext()}.csv'
+            for row in (['boundary', 'x\x1f5', 10, '2024-03-01 10:20:30'], ['boundary\x1fx', '5', 10, '2024-03-01 10:20:30']):
+                with open(csv_path, 'w', newline='', encoding='utf-8') as stream:
+                    csv.writer(stream).writerow(row)
+                self.db.reset()  # the import cache is kept, the shared record date is freed
+                assert self.import_csv(csv_path) == (1, 0, {})
+            Path(csv_path).unlink()
+
+            # csv accounts are created in the order of their dates, not of their rows
+
+            csv_path = f'test-import_csv-account-order-{self.db.ext()}.csv'
+            with open(csv_path, 'w', newline='', encoding='utf-8') as stream:
+                csv.writer(stream).writerows([
+                    ['acc-order-b', 'b', 10, '2020-01-01'],
+                    ['acc-order-a', 'a', 10, '2010-01-01'],
+                    ['acc-order-c', 'c', 10, '2021-01-01'],
+                ])
+            assert self.import_csv(csv_path) == (3, 0, {})
+            refs = [self.db.account(name=f'acc-order-{x}')[0] for x in 'abc']
+            assert refs == sorted(refs), refs
+            Path(csv_path).unlink()
+
+            # zakat epochs turn exactly at the cycle boundary
+
+            account_epoch_ref, _ = self.db.account(name='test-epoch-boundary')
+            box_time = Helper.time(datetime.datetime(2000, 1, 1))
+            self.db.track(unscaled_value=100_000, desc='epoch', account=account_epoch_ref, created=box_time)
+            cycle = Helper.TimeCycle()
+            for offset, epochs in ((-1_000, 0), (0, 1), (cycle - 1_000, 1), (cycle, 2)):  # whole seconds apart
+                now = Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(box_time) + cycle + offset))
+                _, _, plan = self.db.check(2.17, now=now, cycle=cycle, debug=debug)
+                counts = [x['count'] for x in plan.get(account_epoch_ref, {}).values()]
+                assert counts == ([epochs] if epochs else []), (offset, counts)
+
+            # many tracks at once, more than one lookup chunk
+
+            account_many_ref, _ = self.db.account(name='test-track-many')
+            times = Helper.times(2 * REFS_EXIST_CHUNK_SIZE + 1)
+            assert self.db.track_many(account_many_ref, [(1, 'many', created) for created in times]) == times
+            assert self.db.balance(account_many_ref, cached=False) == Helper.scale(len(times))
+            try:
+                fresh_times = Helper.times(REFS_EXIST_CHUNK_SIZE)
+                self.db.track_many(account_many_ref, [(1, 'again', created) for created in fresh_times + [times[-1]]])
+                assert False, 'an already tracked time in the last lookup chunk must be caught'
+            except ValueError:
+                pass
+            try:
+                repeated = Helper.time()
+                self.db.track_many(account_many_ref, [(1, 'twice', repeated), (2, 'twice', repeated)])
+                assert False, 'a time repeated within the batch must be caught'
+            except ValueError as e:
+                assert str(e) == f"The log transaction('twice') happened again in the same time({repeated}).", e
+            balance = self.db.balance(account_many_ref, cached=False)
+            generated = self.db.track_many(account_many_ref, [(1, 'generated', None), (0, 'generated', None)])
+            assert len(generated) == 2 and isinstance(generated[0], str) and generated[1] is None, generated
+            assert self.db.balance(account_many_ref, cached=False) == balance + Helper.scale(1)
+            try:
+                self.db.track_many(account_many_ref, [(1, 'not-a-str', datetime.datetime.now())])
+                assert False, 'a created that is not a str must be rejected'
+            except ValueError as e:
+                assert str(e).startswith('The created must be a str'), e
+
             # csv
 
             csv_count = 1000
 
             for with_rate, path in {
-                False: 'test-import_csv-no-exchange',
-                True: 'test-import_csv-with-exchange',
+                False: f'test-import_csv-no-exchange-{self.db.ext()}',
+                True: f'test-import_csv-with-exchange-{self.db.ext()}',
             }.items():
 
                 if debug:
                     print('test_import_csv', with_rate, path)
 
                 csv_path = path + '.csv'
-                if os.path.exists(csv_path):
-                    os.remove(csv_path)
+                Path(csv_path).unlink(missing_ok=True)
                 c = self.generate_random_csv_file(csv_path, csv_count, with_rate, debug)
                 if debug:
                     print('generate_random_csv_file', c)
                 assert c == csv_count
                 assert os.path.getsize(csv_path) > 0
                 cache_path = self.db.import_csv_cache_path()
-                if os.path.exists(cache_path):
-                    os.remove(cache_path)
+                Path(cache_path).unlink(missing_ok=True)
                 self.db.reset()
-                (created, found, bad) = self.import_csv(csv_path, debug)
+                (created, found, bad) = self.import_csv(csv_path, debug, batch_size=100)
                 bad_count = len(bad)
                 assert bad_count > 0
                 if debug:
@@ -4763,6 +5851,7 @@ class ZakatTracker:
                 # dynamic discount
                 suite = []
                 count = 3
+                x_rates = {}  # account: its current rate, exchanges do not change while the suite is built
                 for exceed in [False, True]:
                     case = []
                     for parts in [positive_parts, all_parts]:
@@ -4780,8 +5869,9 @@ class ZakatTracker:
                         }
                         j = ''
                         for x, y in part['account'].items():
-                            x_exchange = self.db.exchange(x, debug=debug)
-                            zz = Helper.exchange_calc(z, 1, x_exchange['rate'])
+                            if x not in x_rates:
+                                x_rates[x] = self.db.exchange(x, debug=debug)['rate']
+                            zz = Helper.exchange_calc(z, 1, x_rates[x])
                             if exceed and zz <= demand:
                                 i += 1
                                 y['part'] = zz
@@ -4825,7 +5915,7 @@ class ZakatTracker:
             assert self.db.save(path + f'.{self.db.ext()}')
             assert self.db.export_json(path + '.json')
 
-            assert self.db.export_json("1000-transactions-test.json")
+            assert self.db.export_json(f"1000-transactions-test.{self.db.ext()}.json")
             assert self.db.save(f"1000-transactions-test.{self.db.ext()}")
 
             self.db.reset()
@@ -4976,11 +6066,12 @@ class ZakatTracker:
                 assert fresh_value == a_SAR_balance
                 i += 1
 
-            assert self.db.export_json("accounts-transfer-with-exchange-rates.json")
+            assert self.db.export_json(f"accounts-transfer-with-exchange-rates.{self.db.ext()}.json")
             assert self.db.save(f"accounts-transfer-with-exchange-rates.{self.db.ext()}")
 
             # check & zakat with exchange rates for many cycles
 
+            cycle = Helper.TimeCycle()
             for rate, values in {
                 1: {
                     'in': [1000, 2000, 10000],
@@ -5001,13 +6092,13 @@ class ZakatTracker:
                 if debug:
                     print('rate', rate, 'values', values)
                 for case in [
-                    (a, account_safe_ref, Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(Helper.time()) - Helper.TimeCycle())), [
+                    (a, account_safe_ref, Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(Helper.time()) - cycle)), [
                         {account_safe_ref: {0: {'below_nisab': x}}},
                     ], False, m),
-                    (b, account_safe_ref, Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(Helper.time()) - Helper.TimeCycle())), [
+                    (b, account_safe_ref, Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(Helper.time()) - cycle)), [
                         {account_safe_ref: {0: {'count': 1, 'total': y}}},
                     ], True, n),
-                    (c, account_cave_ref, Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(Helper.time()) - (Helper.TimeCycle() * 3))), [
+                    (c, account_cave_ref, Helper.time(Helper.milliseconds_to_datetime(Helper.time_to_milliseconds(Helper.time()) - cycle * 3)), [
                         {account_cave_ref: {0: {'count': 3, 'total': z}}},
                     ], True, o),
                 ]:
@@ -5054,11 +6145,95 @@ class ZakatTracker:
                     assert valid is False
             return True
         except Exception as e:
-            assert self.db.export_json("test-snapshot.json")
+            assert self.db.export_json(f"test-snapshot.{self.db.ext()}.json")
             assert self.db.save(f"test-snapshot.{self.db.ext()}")
             raise e
 
 
+class Timer:
+    """
+    A context manager measuring the time spent in its block with `perf_counter_ns`, timers can be nested.
+
+    Example:
+    with Timer() as timer:
+        ...
+    print(timer.elapsed_ns)
+    """
+
+    def __init__(self):
+        self.start_ns = 0
+        self.elapsed_ns = 0
+
+    def __enter__(self):
+        self.start_ns = perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed_ns = perf_counter_ns() - self.start_ns
+
+
+class ModelTestResult(NamedTuple):
+    """
+    The outcome of testing one model in `test`, durations are in nanoseconds.
+    """
+    model: str
+    provider: str
+    duration: int
+    model_duration: int
+    ledger_duration: int
+
+
+def _is_reachable(host: str, port: int, timeout: float = 0.1) -> bool:
+    """
+    Checks whether a server accepts TCP connections, without waiting for the driver's own connect timeout.
+
+    Parameters:
+    host (str): The host of the server.
+    port (int): The port of the server.
+    timeout (float, Optional): The seconds to wait for the connection. Default is 0.1.
+
+    Returns:
+    bool: True if the connection was accepted, False otherwise.
+    """
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+def _test_model(model_class: type, model_params: dict, debug: bool = False) -> ModelTestResult:
+    """
+    Builds a model and runs the `Model` and `ZakatTracker` tests against it, in a worker process of `test`.
+
+    The model is built inside the worker, because database bindings cannot be pickled between processes.
+
+    Parameters:
+    model_class (type): The model class to test, `DictModel` or `SQLModel`.
+    model_params (dict): The keyword arguments to build the model with.
+    debug (bool, Optional): If True, enables detailed logging and output during the test process.
+
+    Returns:
+    ModelTestResult: The model, its provider and the durations of its tests, in total and per phase.
+    """
+    model = model_class(**model_params)
+    if isinstance(model, SQLModel):
+        model.warmup()
+    ledger = ZakatTracker(model=model)
+    with Timer() as total:
+        with Timer() as model_phase:
+            assert model.test(debug=debug)
+        with Timer() as ledger_phase:
+            assert ledger.test(debug=debug)
+    return ModelTestResult(
+        model.__class__.__name__,
+        model.provider,
+        total.elapsed_ns,
+        model_phase.elapsed_ns,
+        ledger_phase.elapsed_ns,
+    )
+
+
 def test(
         debug: bool = False,
         dict_model: bool = True,
@@ -5067,6 +6242,8 @@ def test(
         mariadb_model: bool = False,
         postgresql_model: bool = False,
         cockroachdb_model: bool = False,
+        run_helper: bool = True,
+        bench_path: str = None,
 ) -> None:
     """
         Conducts comprehensive tests on various ZakatTracker models.
@@ -5084,70 +6261,113 @@ def test(
         mariadb_model: If True, tests the MariaDB model.
         postgresql_model: If True, tests the PostgreSQL model.
         cockroachdb_model: If True, tests the CockroachDB model.
+        run_helper: If True, runs the `Helper` tests before the models.
+        bench_path: If given, a JSON line per model result is appended to this file, to compare runs across commits.
 
         Returns: None
+
+        Raises:
+        NotImplementedError: If the MariaDB, PostgreSQL or CockroachDB model is enabled, they have no test setup yet.
     """
-    models = []
-    durations = {}
-    # clean
-    test_directory = 'zakat_test_db'
-    if os.path.exists(test_directory):
-        shutil.rmtree(test_directory)
-        print(f"{test_directory} Directory removed successfully.")
-    else:
-        print(f"{test_directory} Directory does not exist.")
-    Helper.test(debug=True)
+    results: list[ModelTestResult] = []
+    if run_helper:
+        Helper.test(debug=True)
+    for name, enabled in (
+            ('mariadb', mariadb_model),
+            ('postgresql', postgresql_model),
+            ('cockroachdb', cockroachdb_model),
+    ):
+        if enabled:
+            raise NotImplementedError(f'The {name} model is not tested yet.')
+    if mysql_model and not _is_reachable('127.0.0.1', 3306):
+        print('mysql skipped: 127.0.0.1:3306 is not reachable')
+        mysql_model = False
     # models
-    if dict_model:
-        models.append(
-            DictModel(
-                db_path=f"./{test_directory}/zakat.camel",
-            ),
-        )
-    if sqlite_model:
-        models.append(
-            SQLModel(
-                provider="sqlite",
-                filename=f"./{test_directory}/zakat.sqlite",
-                create_db=True,
-                debug=True,
-            ),
-        )
-    if mysql_model:
-        models.append(
-            SQLModel(
-                provider='mysql',
-                host='127.0.0.1',
-                user='root',
-                passwd='t00r',
-                db='zakat',
-                debug=True,
-            ),
-        )
-    if mariadb_model:
-        pass
-    if postgresql_model:
-        pass
-    if cockroachdb_model:
-        pass
-    for model in models:
-        start = time_ns()
-        assert model.test(debug=debug)
-        ledger = ZakatTracker(model=model)
-        assert ledger.test(debug=debug)
-        durations[f'{model.__class__.__name__}({model.provider})'] = time_ns() - start
+    # each model is built and tested in its own process, they share no database nor output file
+    # the databases live in a fresh temporary directory, removed with everything in it once the models are tested
+    with tempfile.TemporaryDirectory(prefix='zakat_test_') as test_directory:
+        models = [
+            (model_class, model_params)
+            for enabled, model_class, model_params in (
+                (dict_model, DictModel, dict(
+                    db_path=f"{test_directory}/zakat.camel",
+                )),
+                (sqlite_model, SQLModel, dict(
+                    provider="sqlite",
+                    filename=f"{test_directory}/zakat.sqlite",
+                    create_db=True,
+                    debug=True,
+                )),
+                (mysql_model, SQLModel, dict(
+                    provider='mysql',
+                    host='127.0.0.1',
+                    user='root',
+                    passwd='t00r',
+                    db='zakat',
+                    debug=True,
+                )),
+            )
+            if enabled
+        ]
+        if models:
+            with ProcessPoolExecutor(max_workers=len(models)) as executor:
+                futures = [
+                    executor.submit(_test_model, model_class, model_params, debug)
+                    for model_class, model_params in models
+                ]
+                results = [future.result() for future in futures]
+    if bench_path:
+        try:
+            sha = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            sha = None
+        with open(bench_path, 'a') as file:
+            for result in results:
+                file.write(JSONEncoder.dumps({
+                    'sha': sha,
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'model': result.model,
+                    'provider': result.provider,
+                    'duration': result.duration,
+                    'model_duration': result.model_duration,
+                    'ledger_duration': result.ledger_duration,
+                }) + '\n')
     if debug:
         print("#########################")
         print("######## TEST DONE ########")
         print("#########################")
-        for model_name, duration in durations.items():
-            print("------------- Model: [" + model_name + "] -------------")
-            print(Helper.duration_from_nanoseconds(duration))
+        print(f"{'model':24s} {'duration':>14s} {'model.test':>14s} {'ledger.test':>14s}")
+        for result in results:
+            print(
+                f"{f'{result.model}({result.provider})':24s}"
+                f" {result.duration / 1e6:11.2f} ms"
+                f" {result.model_duration / 1e6:11.2f} ms"
+                f" {result.ledger_duration / 1e6:11.2f} ms"
+            )
         print("#########################")
 
 
 def main():
-    test(debug=True)
+    # only the models with a test setup, the others raise NotImplementedError in test()
+    backends = ('dict', 'sqlite', 'mysql')
+    parser = argparse.ArgumentParser(description='Runs the ZakatTracker tests against the selected models.')
+    parser.add_argument(
+        '--backend',
+        action='append',
+        choices=backends,
+        help='a model to test, can be repeated, defaults to the local ones: dict and sqlite',
+    )
+    args = parser.parse_args()
+    selected = args.backend or ['dict', 'sqlite']
+    # ZAKAT_SKIP_HELPER=1 skips the Helper tests, when iterating on the models only
+    # ZAKAT_BENCH_PATH=<file> appends the durations of the models to that JSON lines file
+    test(
+        debug=True,
+        run_helper=not os.environ.get('ZAKAT_SKIP_HELPER'),
+        bench_path=os.environ.get('ZAKAT_BENCH_PATH'),
+        **{f'{backend}_model': backend in selected for backend in backends},
+    )
 
 
 if __name__ == "__main__":